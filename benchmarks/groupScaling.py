@@ -0,0 +1,48 @@
+"""
+Scaling of a `DAQGroup` with the number of devices. Every device is
+simulated in real time, so a read takes as long as on a MyDAQ, and the
+throughput should grow linearly with the number of devices.
+"""
+
+from time import perf_counter
+from span.daq import MyDAQ
+from span.group import DAQGroup
+from span.simulation import SimulatedBackend
+
+samplerate = 200_000
+duration = 1
+channels = ["AI0", "AI1"]
+
+
+def createGroup(devices: int) -> DAQGroup:
+    daqs = []
+    for i in range(devices):
+        daq = MyDAQ(SimulatedBackend(noise=0.1, realtime=True, seed=i))
+        daq.samplerate = samplerate
+        daq.name = f"myDAQ{i + 1}"
+        daqs.append(daq)
+
+    return DAQGroup(daqs)
+
+
+def timeGroup(devices: int, repeats: int = 3) -> float:
+    """
+    Samples per second read by all devices together
+    """
+    with createGroup(devices) as group:
+        start = perf_counter()
+        for _ in range(repeats):
+            group.read(duration, *channels)
+        elapsed = perf_counter() - start
+
+    samples = repeats * devices * len(channels) * samplerate * duration
+    return samples / elapsed
+
+
+if __name__ == "__main__":
+    print(f"{'devices':>8} {'[S/s]':>12} {'scaling':>8}")
+
+    single = timeGroup(1)
+    for devices in [1, 2, 4, 8]:
+        rate = single if devices == 1 else timeGroup(devices)
+        print(f"{devices:>8} {rate:>12.3e} {rate / single:>8.2f}")
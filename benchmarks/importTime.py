@@ -0,0 +1,62 @@
+"""
+Check of the time it takes to import `span.bode` and `span.sweep` in a
+fresh interpreter, against a budget. Plotting (matplotlib), hardware
+(nidaqmx) and slow scipy modules should only be imported on first use,
+so importing them in e.g. a (spawned) worker process costs little more
+than numpy. Exits with status 1 if the budget is exceeded, or if any of
+those modules were imported.
+"""
+
+from argparse import ArgumentParser
+import subprocess
+import sys
+
+modules = ["span.bode", "span.sweep"]
+deferred = ["matplotlib", "nidaqmx", "scipy.signal", "scipy.integrate"]
+
+# Prints the import time of a module, and which deferred modules were imported
+script = """
+from time import perf_counter
+import sys
+start = perf_counter()
+import {module}
+print(perf_counter() - start)
+print(",".join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+
+def measureImport(module: str) -> tuple[float, list[str]]:
+    """
+    Import time of `module` in seconds in a fresh interpreter, and the
+    deferred modules that were imported anyway
+    """
+    code = script.format(module=module, deferred=deferred)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+
+    return float(output[0]), [name for name in output[1].split(",") if name]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget", type=float, default=0.3, help="in seconds")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in modules:
+        # The best of several runs, as the first may include filling disk caches
+        results = [measureImport(module) for _ in range(args.repeats)]
+        best = min(duration for duration, __ in results)
+        imported = results[0][1]
+
+        budget = f"budget {args.budget * 1e3:.0f} ms"
+        print(f"import {module}: {best * 1e3:.1f} ms ({budget})")
+        if imported:
+            print(f"Imported at load, but should be deferred: {', '.join(imported)}")
+
+        failed = failed or best > args.budget or bool(imported)
+
+    if failed:
+        sys.exit(1)
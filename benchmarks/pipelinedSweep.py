@@ -0,0 +1,41 @@
+"""
+Duration of a sweep measured point by point with `runSweep`, against
+overlapping generation and analysis with acquisition in `pipelineSweep`.
+The simulated backend runs in real time, so acquiring takes as long as
+it would on the MyDAQ.
+"""
+
+from time import perf_counter
+import numpy as np
+from scipy.signal import TransferFunction
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+from span.sweep import pipelineSweep, planSweep, runSweep
+
+samplerate = 200_000
+wres = 1000
+H = TransferFunction([wres], [1, wres])
+
+
+def timeSweep(sweep, plan, method: str) -> float:
+    backend = SimulatedBackend(
+        routes={"AI0": ("AO0", H), "AI1": "AO0"}, realtime=True, seed=0
+    )
+    daq = MyDAQ(backend)
+    daq.samplerate = samplerate
+    daq.name = "myDAQ1"
+
+    start = perf_counter()
+    sweep(daq, plan, ["AI0", "AI1"], "AO0", method=method)
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    plan = planSweep(np.logspace(1, 4.5, 20), samplerate, minSamples=20_000)
+    print(plan)
+
+    print(f"\n{'method':>10} {'serial [s]':>11} {'pipelined [s]':>14}")
+    for method in ["fft", "sinefit"]:
+        serial = timeSweep(runSweep, plan, method)
+        pipelined = timeSweep(pipelineSweep, plan, method)
+        print(f"{method:>10} {serial:>11.2f} {pipelined:>14.2f}")
@@ -0,0 +1,65 @@
+"""
+Benchmark of reading through nidaqmx-style `task.read` (nested Python
+lists, converted with np.asarray) against reading through a stream
+reader into a preallocated buffer. Uses the simulated backend as a fake
+task, so no hardware is needed.
+"""
+
+from time import perf_counter
+import numpy as np
+from span.simulation import SimulatedBackend
+
+samplerate = 200_000
+channels = ["myDAQ1/ai0", "myDAQ1/ai1"]
+
+
+def createTask(backend: SimulatedBackend, samples: int):
+    task = backend.Task("benchmark")
+    for channel in channels:
+        task.ai_channels.add_ai_voltage_chan(channel)
+    task.timing.cfg_samp_clk_timing(samplerate, samps_per_chan=samples)
+    task.start()
+
+    return task
+
+
+def readLists(task, samples: int, buffer: np.ndarray) -> np.ndarray:
+    return np.asarray(task.read(number_of_samples_per_channel=samples))
+
+
+def readStream(task, samples: int, buffer: np.ndarray) -> np.ndarray:
+    task.backend.reader(task).read_many_sample(
+        buffer, number_of_samples_per_channel=samples
+    )
+    return buffer
+
+
+def timeRead(read, samples: int, repeats: int = 5) -> float:
+    """
+    Best time out of `repeats` reads of `samples` samples per channel
+    """
+    backend = SimulatedBackend()
+    buffer = np.empty((len(channels), samples))
+    best = np.inf
+
+    with createTask(backend, samples) as task:
+        for _ in range(repeats):
+            start = perf_counter()
+            read(task, samples, buffer)
+            best = min(best, perf_counter() - start)
+
+    return best
+
+
+if __name__ == "__main__":
+    print(f"{'samples':>10} {'lists [S/s]':>14} {'stream [S/s]':>14} {'speedup':>8}")
+
+    for samples in [1_000, 10_000, 100_000, 1_000_000]:
+        total = samples * len(channels)
+        lists = timeRead(readLists, samples)
+        stream = timeRead(readStream, samples)
+
+        print(
+            f"{samples:>10} {total / lists:>14.3e} {total / stream:>14.3e} "
+            f"{lists / stream:>8.1f}"
+        )
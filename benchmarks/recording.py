@@ -0,0 +1,78 @@
+"""
+Benchmark of recording to disk with `RecordingWriter`, compared to the
+rate of 200 kS/s on two channels that recordings should keep up with.
+Also records through `MyDAQ.record` with the simulated backend, which
+includes generating the simulated samples. No hardware is needed.
+"""
+
+import os
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import numpy as np
+from span.daq import MyDAQ
+from span.recording import Recording, RecordingWriter
+from span.simulation import SimulatedBackend
+
+samplerate = 200_000
+channels = ["AI0", "AI1"]
+required = samplerate * len(channels)
+
+
+def timeWriter(path: str, chunkSize: int, chunks: int, dtype) -> float:
+    """
+    Samples per second written in chunks of `chunkSize` samples per channel
+    """
+    chunk = np.random.default_rng(0).standard_normal((len(channels), chunkSize))
+
+    start = perf_counter()
+    with RecordingWriter(path, samplerate, channels, dtype=dtype) as writer:
+        for _ in range(chunks):
+            writer.write(chunk)
+    elapsed = perf_counter() - start
+
+    return chunkSize * chunks * len(channels) / elapsed
+
+
+def timeRecord(path: str, duration: float) -> float:
+    """
+    Samples per second recorded through `MyDAQ.record`
+    """
+    daq = MyDAQ(SimulatedBackend(noise=0.1, seed=0))
+    daq.samplerate = samplerate
+    daq.name = "myDAQ1"
+
+    start = perf_counter()
+    recording = daq.record(path, duration, *channels)
+    elapsed = perf_counter() - start
+
+    return recording.samples * len(channels) / elapsed
+
+
+def timeReopen(path: str) -> float:
+    """
+    Seconds to reopen a recording and compute the mean of a one second slice
+    """
+    start = perf_counter()
+    Recording(path).getSlice(1, 1).mean()
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"Required: {required:.3e} S/s\n")
+    print(f"{'chunk':>8} {'dtype':>8} {'write [S/s]':>14} {'margin':>8}")
+
+    with TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.bin")
+
+        for chunkSize in [1_000, 20_000, 100_000]:
+            for dtype in [np.float64, np.float32]:
+                chunks = 20 * samplerate // chunkSize
+                rate = timeWriter(path, chunkSize, chunks, dtype)
+                print(
+                    f"{chunkSize:>8} {np.dtype(dtype).name:>8} {rate:>14.3e} "
+                    f"{rate / required:>8.1f}"
+                )
+
+        rate = timeRecord(path, 20)
+        print(f"\nMyDAQ.record (simulated): {rate:.3e} S/s, {rate / required:.1f}x")
+        print(f"Reopen and slice: {timeReopen(path) * 1e3:.2f} ms")
@@ -0,0 +1,74 @@
+"""
+Benchmark of `RollingSpectrum` on a stream of 200 kS/s on two channels.
+Measures how many frames per second can be transformed when the chunks
+arrive as fast as the simulated backend makes them (without limiting
+the rate of publication), compared to the frames per second of a
+real-time stream. Then streams in real time, and
+finally with a subscriber too slow to keep up, which should drop frames
+instead of falling behind. No hardware is needed.
+"""
+
+from time import perf_counter, sleep
+import numpy as np
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+from span.spectral import RollingSpectrum
+
+samplerate = 200_000
+channels = ["AI0", "AI1"]
+chunkSize = 10_000
+
+
+def source(t: np.ndarray) -> np.ndarray:
+    return np.vstack([np.sin(2 * np.pi * 1000 * t), np.sin(2 * np.pi * 5000 * t)])
+
+
+def stream(
+    duration: float,
+    realtime: bool,
+    onFrames=None,
+    rate: float = 30,
+    backlog: float = 1,
+) -> dict:
+    """
+    Statistics of a `RollingSpectrum` of a stream of `duration` seconds
+    """
+    daq = MyDAQ(SimulatedBackend(source=source, noise=0.01, realtime=realtime))
+    daq.samplerate = samplerate
+    daq.name = "myDAQ1"
+
+    chunks = int(duration * samplerate / chunkSize)
+    spectrum = RollingSpectrum(
+        samplerate, channels=len(channels), rate=rate, backlog=backlog
+    )
+    if onFrames is not None:
+        spectrum.subscribe(onFrames)
+
+    start = perf_counter()
+    with spectrum:
+        for chunk in daq.stream(chunkSize, *channels, chunks=chunks):
+            spectrum.update(chunk)
+        backlog = spectrum.backlog
+    statistics = spectrum.getStatistics()
+
+    statistics["elapsed"] = perf_counter() - start
+    statistics["backlog"] = backlog
+    return statistics
+
+
+def show(title: str, statistics: dict) -> None:
+    print(
+        f"{title:>12}: {statistics['frames']:5d} frames in"
+        f" {statistics['elapsed']:5.2f} s ({statistics['framesPerSecond']:7.1f}/s),"
+        f" {statistics['publications']:4d} publications,"
+        f" {statistics['dropped']:5d} dropped, backlog {statistics['backlog']:.3f} s"
+    )
+
+
+if __name__ == "__main__":
+    step = RollingSpectrum(samplerate).step
+    print(f"Real-time stream: {samplerate / step:.1f} frames/s")
+
+    show("as fast", stream(10, realtime=False, rate=10_000, backlog=5))
+    show("real time", stream(5, realtime=True, onFrames=lambda frames: None))
+    show("slow", stream(5, realtime=True, onFrames=lambda frames: sleep(1.5)))
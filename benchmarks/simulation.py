@@ -0,0 +1,44 @@
+"""
+Benchmark of simulating a lowpass filter with `lsim` once per capture,
+against routing the output through the simulated backend of `MyDAQ`.
+"""
+
+from time import perf_counter
+import numpy as np
+from scipy.signal import TransferFunction, lsim
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+
+samplerate = 200_000
+wres = 1000
+H = TransferFunction([0, wres], [1, wres])
+
+
+def timeLsim(signal: np.ndarray, timeArray: np.ndarray) -> float:
+    start = perf_counter()
+    lsim(H, signal, timeArray)
+    return perf_counter() - start
+
+
+def timeBackend(daq: MyDAQ, signal: np.ndarray) -> float:
+    start = perf_counter()
+    daq.readwrite(signal, ["AI0", "AI1"], "AO0")
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    daq = MyDAQ(SimulatedBackend(routes={"AI0": ("AO0", H), "AI1": "AO0"}, seed=0))
+    daq.samplerate = samplerate
+    daq.name = "myDAQ1"
+
+    print(f"{'samples':>10} {'lsim [S/s]':>14} {'backend [S/s]':>14} {'speedup':>8}")
+
+    for duration in [0.01, 0.1, 1, 3]:
+        timeArray, signal = daq.generateWaveform("sine", samplerate, 100, duration=duration)
+        lsimTime = timeLsim(signal, timeArray)
+        backendTime = timeBackend(daq, signal)
+
+        print(
+            f"{signal.size:>10} {signal.size / lsimTime:>14.3e} "
+            f"{signal.size / backendTime:>14.3e} {lsimTime / backendTime:>8.1f}"
+        )
@@ -0,0 +1,224 @@
+"""
+Benchmark suite of the acquisition and spectral analysis paths of span,
+using the simulated backend in `span.simulation` instead of the MyDAQ.
+Reports the throughput in samples per second (best of several runs) and
+the peak memory allocated by each case. Results can be saved as a
+baseline, and compared against a saved baseline:
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json
+
+Comparing exits with status 1 if any case got slower or used more memory
+than the baseline by more than the tolerance.
+"""
+
+from argparse import ArgumentParser
+import json
+import sys
+from time import perf_counter
+import tracemalloc
+import numpy as np
+from scipy.signal import TransferFunction
+from span.bode import Bode, batchHarmonics
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+
+samplerate = 200_000
+wres = 1000
+H = TransferFunction([0, wres], [1, wres])
+
+
+def createDAQ() -> MyDAQ:
+    daq = MyDAQ(SimulatedBackend(routes={"AI0": ("AO0", H), "AI1": "AO0"}, seed=0))
+    daq.samplerate = samplerate
+    daq.name = "myDAQ1"
+
+    return daq
+
+
+def waveformCases():
+    for function, frequency in [("sine", 1000), ("sine", 1234.567), ("square", 1000)]:
+        for samples in [1_000, 100_000, 1_000_000]:
+            duration = MyDAQ.convertSamplesToDuration(samplerate, samples)
+
+            def run(function=function, frequency=frequency, duration=duration):
+                MyDAQ.generateWaveform(
+                    function, samplerate, frequency, duration=duration, cache=False
+                )
+
+            yield f"waveform/{function}@{frequency:g}/{samples}", samples, run
+
+
+def bodeCases():
+    rng = np.random.default_rng(0)
+
+    for samples in [10_000, 100_000, 1_000_000]:
+        voltageOut = rng.standard_normal(samples)
+        voltageIn = rng.standard_normal(samples)
+        delta = 1.5 * samplerate / samples
+
+        for count in [1, 10, 100]:
+            freqs = np.linspace(1000, samplerate / 4, count)
+
+            # A new Bode per run, so the spectra are not taken from its cache
+            def run(
+                voltageOut=voltageOut, voltageIn=voltageIn, freqs=freqs, delta=delta
+            ):
+                bode = Bode(samplerate, voltageOut, voltageIn)
+                bode.getPowers(freqs, delta)
+                bode.getPhases(freqs)
+
+            yield f"bode/{samples}/{count}", 2 * samples, run
+
+
+def harmonicCases():
+    fundamental = 1000
+    for samples in [10_000, 100_000]:
+        duration = MyDAQ.convertSamplesToDuration(samplerate, samples)
+        __, voltageIn = MyDAQ.generateWaveform(
+            "square", samplerate, fundamental, duration=duration
+        )
+        voltageOut = 0.5 * voltageIn
+
+        # A new Bode per run, so the spectra are not taken from its cache
+        def run(voltageOut=voltageOut, voltageIn=voltageIn):
+            Bode(samplerate, voltageOut, voltageIn).getHarmonics(fundamental, 20)
+
+        def batch(voltageOut=voltageOut, voltageIn=voltageIn):
+            batchHarmonics(
+                samplerate,
+                fundamental,
+                np.tile(voltageOut, (20, 1)),
+                np.tile(voltageIn, (20, 1)),
+                harmonics=20,
+            )
+
+        yield f"harmonics/{samples}", 2 * samples, run
+        yield f"harmonics/20x{samples}", 40 * samples, batch
+
+
+def acquisitionCases():
+    daq = createDAQ()
+
+    for samples in [10_000, 1_000_000]:
+        duration = MyDAQ.convertSamplesToDuration(samplerate, samples)
+        __, signal = daq.generateWaveform("sine", samplerate, 1000, duration=duration)
+        out = np.empty((2, samples))
+
+        def read(duration=duration, out=out):
+            daq.read(duration, "AI0", "AI1", out=out)
+
+        def readwrite(signal=signal, out=out):
+            daq.readwrite(signal, ["AI0", "AI1"], "AO0", out=out)
+
+        yield f"read/{samples}", 2 * samples, read
+        yield f"readwrite/{samples}", 3 * samples, readwrite
+
+
+def sweepCases():
+    daq = createDAQ()
+    freqs = np.logspace(2, 4.5, 10)
+
+    for duration in [0.1, 1]:
+        samples = MyDAQ.convertDurationToSamples(samplerate, duration)
+        delta = 1.5 * samplerate / samples
+
+        # As in examples/spectrumSimulation.py
+        def run(duration=duration, delta=delta):
+            with daq.session():
+                for freq in freqs:
+                    __, signalWrite = daq.generateWaveform(
+                        "sine", samplerate, frequency=freq, duration=duration
+                    )
+                    signalOut, signalIn = daq.readwrite(
+                        signalWrite, ["AI0", "AI1"], "AO0"
+                    )
+                    bode = Bode(samplerate, signalOut, signalIn)
+                    bode.getPower(freq, delta)
+                    bode.getPhase(freq)
+
+        yield f"sweep/{freqs.size}x{samples}", 3 * freqs.size * samples, run
+
+
+CASES = [waveformCases, bodeCases, harmonicCases, acquisitionCases, sweepCases]
+
+
+def measure(samples: int, run, repeats: int) -> dict:
+    """
+    Throughput of the best of `repeats` runs, and the peak memory of one run
+    """
+    run()
+
+    best = np.inf
+    for _ in range(repeats):
+        start = perf_counter()
+        run()
+        best = min(best, perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    __, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": best, "samplesPerSecond": samples / best, "peakBytes": peak}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Print the change of every case relative to `baseline`, returning
+    whether any case regressed by more than `tolerance`
+    """
+    print(f"\n{'case':<32} {'throughput':>11} {'memory':>8}")
+
+    regressed = False
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<32} {'new':>11}")
+            continue
+
+        speed = result["samplesPerSecond"] / baseline[name]["samplesPerSecond"]
+        memory = (result["peakBytes"] + 1) / (baseline[name]["peakBytes"] + 1)
+        slower = speed < 1 - tolerance
+        larger = memory > 1 + tolerance
+        regressed |= slower or larger
+
+        flag = "  REGRESSION" if slower or larger else ""
+        print(f"{name:<32} {speed:>10.2f}x {memory:>7.2f}x{flag}")
+
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", help="save the results as a baseline to this file")
+    parser.add_argument("--compare", help="compare against the baseline in this file")
+    parser.add_argument("--filter", default="", help="only run cases containing this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{'case':<32} {'[S/s]':>10} {'time [ms]':>10} {'peak [MB]':>10}")
+
+    results = {}
+    for cases in CASES:
+        for name, samples, run in cases():
+            if args.filter not in name:
+                continue
+
+            results[name] = measure(samples, run, args.repeats)
+            result = results[name]
+            print(
+                f"{name:<32} {result['samplesPerSecond']:>10.3e} "
+                f"{result['seconds'] * 1e3:>10.2f} {result['peakBytes'] / 2**20:>10.2f}"
+            )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,39 @@
+"""
+Scaling of `simulateSweep` with the number of worker processes, for the
+lowpass filter sweep of `examples/spectrumSimulation.py`.
+"""
+
+import os
+from time import perf_counter
+import numpy as np
+from scipy.signal import TransferFunction
+from span.sweep import simulateSweep
+
+samplerate = 200_000
+samples = 600_000
+freqs = np.logspace(0, 5, 50)
+
+wres = 1000
+H = TransferFunction([wres], [1, wres])
+
+
+def timeSweep(workers: int) -> float:
+    start = perf_counter()
+    simulateSweep(H, freqs, samplerate, samples, workers=workers)
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    workerCounts = [1]
+    while workerCounts[-1] * 2 <= os.cpu_count():
+        workerCounts.append(workerCounts[-1] * 2)
+
+    print(f"{'workers':>8} {'time [s]':>10} {'speedup':>8} {'efficiency':>10}")
+
+    serial = None
+    for workers in workerCounts:
+        elapsed = timeSweep(workers)
+        serial = serial or elapsed
+        speedup = serial / elapsed
+
+        print(f"{workers:>8} {elapsed:>10.2f} {speedup:>8.2f} {speedup / workers:>10.2f}")
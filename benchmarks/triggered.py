@@ -0,0 +1,149 @@
+"""
+Check of `MyDAQ.triggered` against the simulated backend, with pulses at
+known samples. Covers edges exactly at and just before chunk boundaries,
+triggers ignored within the holdoff, pre-trigger windows truncated at the
+start of the stream, falling edges, and that the caller's `Trigger` is
+left unchanged. The second channel reads the sample index, so the
+content of every window is checked too. No hardware is needed.
+Exits with status 1 if any check fails.
+"""
+
+import sys
+import numpy as np
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+from span.trigger import RingBuffer, Trigger
+
+samplerate = 10_000
+chunkSize = 1000
+pulseSamples = 50
+
+failures = []
+
+
+def check(name: str, condition: bool) -> None:
+    print(f"{'ok' if condition else 'FAILED':>6}  {name}")
+    if not condition:
+        failures.append(name)
+
+
+def createDAQ(pulses: list[int]) -> MyDAQ:
+    """
+    Simulated device reading pulses of `pulseSamples` samples starting at
+    `pulses` on AI0, and the sample index on AI1
+    """
+
+    def source(t: np.ndarray) -> np.ndarray:
+        index = np.round(t * samplerate)
+        pulse = np.zeros(t.size)
+        for start in pulses:
+            pulse[(index >= start) & (index < start + pulseSamples)] = 1
+
+        return np.vstack([pulse, index])
+
+    daq = MyDAQ(SimulatedBackend(source=source))
+    daq.samplerate = samplerate
+    daq.name = "myDAQ1"
+
+    return daq
+
+
+def checkWindows(name: str, events, pre: int, post: int) -> None:
+    """
+    Every window should hold the samples from `pre` before up to `post`
+    after its trigger, truncated at the start of the stream
+    """
+    correct = True
+    for event in events:
+        start = max(event.sample - pre, 0)
+        expected = np.arange(start, event.sample + post)
+        correct &= event.pre == event.sample - start
+        correct &= np.array_equal(event.data[1], expected)
+        correct &= event.data[0][event.pre] == 1
+        correct &= event.pre == 0 or event.data[0][event.pre - 1] == 0
+
+    check(name, correct)
+
+
+def checkRisingEdges() -> None:
+    # At a chunk boundary, just before one, and within the holdoff of another
+    pulses = [30, 2000, 3999, 4100, 6500, 9000]
+    pre, post = 200, 500
+    trigger = Trigger(0.5, holdoff=1)
+
+    daq = createDAQ(pulses)
+    events = list(
+        daq.triggered(
+            trigger,
+            "AI0",
+            "AI1",
+            pre=pre / samplerate,
+            post=post / samplerate,
+            events=4,
+            chunkSize=chunkSize,
+        )
+    )
+
+    samples = [event.sample for event in events]
+    check("rising edges around chunk boundaries", samples == [30, 2000, 3999, 6500])
+    check("event times", [event.time for event in events] == [0.003, 0.2, 0.3999, 0.65])
+    checkWindows("windows, truncated at the start of the stream", events, pre, post)
+    check("holdoff of the trigger unchanged", trigger.holdoff == 1)
+
+    # Reusing the trigger with a shorter post should not keep a longer holdoff
+    events = daq.triggered(
+        trigger, "AI0", "AI1", post=50 / samplerate, events=5, chunkSize=chunkSize
+    )
+    samples = [event.sample for event in events]
+    check("trigger reused with a shorter post", samples == pulses[:5])
+
+
+def checkFallingEdges() -> None:
+    pulses = [1000 - pulseSamples, 2500]
+    pre, post = 300, 100
+
+    daq = createDAQ(pulses)
+    events = list(
+        daq.triggered(
+            Trigger(0.5, "falling"),
+            "AI0",
+            "AI1",
+            pre=pre / samplerate,
+            post=post / samplerate,
+            events=2,
+            chunkSize=chunkSize,
+        )
+    )
+
+    # A falling edge is the first sample after the pulse
+    samples = [event.sample for event in events]
+    check("falling edge at a chunk boundary", samples == [1000, 2550])
+
+    windows = all(
+        np.array_equal(
+            event.data[1], np.arange(event.sample - pre, event.sample + post)
+        )
+        and event.data[0][event.pre] == 0
+        and event.data[0][event.pre - 1] == 1
+        for event in events
+    )
+    check("falling edge windows", windows)
+
+
+def checkRingBuffer() -> None:
+    ring = RingBuffer(1, 7)
+    for chunk in np.array_split(np.arange(30.0), [3, 5, 15, 16, 29]):
+        ring.write(chunk)
+
+    window = ring.window(23, 30)[0]
+    check("ring buffer keeps the last samples", ring.first == 23 and ring.total == 30)
+    check("ring buffer window across wrapping", np.array_equal(window, np.arange(23, 30)))
+
+
+if __name__ == "__main__":
+    checkRisingEdges()
+    checkFallingEdges()
+    checkRingBuffer()
+
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,38 @@
+"""
+Simple example simulation of a LTI (lowpass filter), showing the bode plot
+while the sweep is running. The simulated MyDAQ runs in real time, and
+every point is added to the plot as soon as it has been analysed.
+"""
+
+import numpy as np
+from span.daq import MyDAQ
+from span.plotting import LiveBodePlot
+from span.simulation import SimulatedBackend
+from span.sweep import pipelineSweep, planSweep
+from scipy.signal import TransferFunction
+
+# Create lowpass filter transfer function
+wres = 1000
+H = TransferFunction([0, wres], [1, wres])
+Hfunc = lambda w: wres / (wres + 1j * w)
+
+# Create simulated daq object, running in real time like the MyDAQ
+backend = SimulatedBackend(routes={"AI0": ("AO0", H), "AI1": "AO0"}, realtime=True)
+daq = MyDAQ(backend)
+daq.samplerate = 200_000
+daq.name = "myDAQ1"
+print(daq)
+
+# Plan the sweep in the domain [10Hz, 30kHz]
+plan = planSweep(np.logspace(1, 4.5, 40), daq.samplerate, periods=10)
+print(plan)
+
+# Plot against angular frequency, like plotBode
+freqs = 2 * np.pi * plan.freqs
+live = LiveBodePlot(freqs, analytic=Hfunc(freqs))
+
+# Measure the sweep, adding every point to the plot as it arrives
+magnitude, phase = pipelineSweep(daq, plan, ["AI0", "AI1"], "AO0", onPoint=live.update)
+
+# Keep the final plot
+live.save("spectrumLive.png")
@@ -21,26 +21,31 @@ powers = np.zeros_like(freqs)
 phases = np.zeros_like(freqs)
 
 
-# Measure over range of frequencies
-for i, freq in enumerate(freqs):
-    print(freq)
+# Measure over range of frequencies. The session keeps the read and write
+# tasks configured between frequencies, instead of recreating them each time
+with daq.session() as session:
+    for i, freq in enumerate(freqs):
+        print(freq)
 
-    # Create sinusoidal waveform
-    timeArray, signalWrite = daq.generateWaveform("sine", daq.samplerate, frequency=freq)
+        # Create sinusoidal waveform
+        timeArray, signalWrite = daq.generateWaveform("sine", daq.samplerate, frequency=freq)
 
-    # Write to channel AO0 and read on channel AI0
-    signalOut, signalIn = daq.readwrite(signalWrite, ["AI0", "AI1"], "AO0")
+        # Write to channel AO0 and read on channel AI0
+        signalOut, signalIn = daq.readwrite(signalWrite, ["AI0", "AI1"], "AO0")
 
-    # Create Bode() instance
-    bode = Bode(daq.samplerate, signalOut, signalIn)
+        # Create Bode() instance
+        bode = Bode(daq.samplerate, signalOut, signalIn)
 
-    # Get power and phase of freq, with a bandwidth delta=1
-    power = bode.getPower(freq, 1)
-    phase = bode.getPhase(freq, 0)
+        # Get power and phase of freq, with a bandwidth delta=1
+        power = bode.getPower(freq, 1)
+        phase = bode.getPhase(freq, 0)
 
-    # Save power and phase of freq.
-    powers[i] = power
-    phases[i] = phase
+        # Save power and phase of freq.
+        powers[i] = power
+        phases[i] = phase
+
+print(f"Task setup: {sum(t.setup for t in session.timings):.2f} s")
+print(f"Acquisition: {sum(t.acquisition for t in session.timings):.2f} s")
 
 # Plot the bode plots
 plotBode(2 * np.pi * freqs, np.sqrt(powers), phases)
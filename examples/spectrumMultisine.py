@@ -0,0 +1,45 @@
+"""
+Simple example simulation of a LTI (lowpass filter), measuring the whole
+bode plot from a single capture with a multisine stimulus, instead of one
+capture per frequency
+"""
+
+import numpy as np
+from span.bode import Bode, plotBode
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+from scipy.signal import TransferFunction
+
+# Create lowpass filter transfer function
+wres = 1000
+H = TransferFunction([0, wres], [1, wres])
+Hfunc = lambda w: wres / (wres + 1j * w)
+
+# Create simulated daq object
+backend = SimulatedBackend(routes={"AI0": ("AO0", H), "AI1": "AO0"})
+daq = MyDAQ(backend)
+daq.samplerate = 200_000
+daq.name = "myDAQ1"
+print(daq)
+
+# Excite all frequencies in the domain [1Hz, 100kHz) at once. The returned
+# frequencies are moved onto the Fourier frequencies of the waveform
+timeArray, signalWrite, freqs = daq.generateMultisine(
+    daq.samplerate, np.logspace(0, 5, 50), amplitude=1, duration=1
+)
+
+# Play the multisine twice, and only analyse the second period, by
+# which time the lowpass filter has settled
+signalOut, signalIn = daq.readwrite(np.tile(signalWrite, 2), ["AI0", "AI1"], "AO0")
+signalOut = signalOut[timeArray.size :]
+signalIn = signalIn[timeArray.size :]
+
+# Extract the transfer function at all excited frequencies at once
+bode = Bode(daq.samplerate, signalOut, signalIn)
+transfer = bode.getTransfer(freqs)
+
+# Analytic solution of transfer function
+analytic = Hfunc(2 * np.pi * freqs)
+
+# Plot the bode plots
+plotBode(2 * np.pi * freqs, np.abs(transfer), np.angle(transfer), analytic=analytic)
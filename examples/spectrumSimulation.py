@@ -1,22 +1,31 @@
 """
 Simple example simulation of a LTI (lowpass filter), and how to use
-the Bode() class to extract information for the bode plots
+the Bode() class to extract information for the bode plots. The MyDAQ
+is simulated, with its output AO0 wired to input AI1 directly, and to
+input AI0 through the lowpass filter.
 """
 
 import numpy as np
 from span.bode import Bode, plotBode
-from scipy.signal import lsim, TransferFunction
-
-# Samplerate and time of simulation
-rate = 200_000
-samples = 600_000
-timeArray = np.linspace(0, samples / rate, samples)
+from span.daq import MyDAQ
+from span.simulation import SimulatedBackend
+from scipy.signal import TransferFunction
 
 # Create lowpass filter transfer function
 wres = 1000
 H = TransferFunction([0, wres], [1, wres])
 Hfunc = lambda w: wres / (wres + 1j * w)
 
+# Create simulated daq object
+backend = SimulatedBackend(routes={"AI0": ("AO0", H), "AI1": "AO0"})
+daq = MyDAQ(backend)
+daq.samplerate = 200_000
+daq.name = "myDAQ1"
+print(daq)
+
+# Duration of simulation
+duration = 3
+
 # Run simulation in the domain [1Hz, 100kHz)
 freqs = np.logspace(0, 5, 50)
 
@@ -25,22 +34,25 @@ powers = np.zeros_like(freqs)
 phases = np.zeros_like(freqs)
 
 # Run simulation over range of frequencies
-for i, freq in enumerate(freqs):
-    print(freq)
-    # Input is simple sine, simulate output
-    signalIn = np.sin(2 * np.pi * freq * timeArray)
-    signalOut = lsim(H, signalIn, timeArray)[1]
-
-    # Create Bode() instance
-    bode = Bode(rate, signalOut, signalIn)
-
-    # Get power and phase of freq, with a bandwidth delta=1
-    power = bode.getPower(freq, 1)
-    phase = bode.getPhase(freq, 0)
-
-    # Save power and phase of freq.
-    powers[i] = power
-    phases[i] = phase
+with daq.session():
+    for i, freq in enumerate(freqs):
+        print(freq)
+        # Input is simple sine, simulate output
+        timeArray, signalWrite = daq.generateWaveform(
+            "sine", daq.samplerate, frequency=freq, duration=duration
+        )
+        signalOut, signalIn = daq.readwrite(signalWrite, ["AI0", "AI1"], "AO0")
+
+        # Create Bode() instance
+        bode = Bode(daq.samplerate, signalOut, signalIn)
+
+        # Get power and phase of freq, with a bandwidth delta=1
+        power = bode.getPower(freq, 1)
+        phase = bode.getPhase(freq, 0)
+
+        # Save power and phase of freq.
+        powers[i] = power
+        phases[i] = phase
 
 # Analytic solution of transfer function
 analytic = Hfunc(2 * np.pi * freqs)
@@ -1,8 +1,30 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib.gridspec import GridSpec
-from scipy.integrate import trapezoid
+from span.instrumentation import instrumentation
+
+
+@dataclass
+class Harmonics:
+    """
+    Harmonic analysis of a capture, as returned by `Bode.getHarmonics`, for
+    the fundamental and its harmonics `freqs` (the last axis). Harmonics
+    above the Nyquist frequency are NaN.
+
+    `amplitudeOut` and `amplitudeIn` are the amplitudes in volts, and
+    `gain` and `phase` their ratio. The gain and phase of a harmonic that
+    is absent from the stimulus (e.g. the even harmonics of a square wave)
+    are meaningless. `thd` is the total harmonic distortion of the output
+    (as a ratio of amplitudes) and `sinad` its signal to noise and
+    distortion ratio in dB.
+    """
+
+    freqs: np.ndarray
+    amplitudeOut: np.ndarray
+    amplitudeIn: np.ndarray | None
+    gain: np.ndarray
+    phase: np.ndarray
+    thd: float | np.ndarray
+    sinad: float | np.ndarray
 
 
 @dataclass
@@ -12,21 +34,142 @@ class Bode:
     an output voltage. If no input voltage is provided,
     assumes input to be 1 (i.e. power and phase will be
     of the output only, NOT the ratio)
+
+    `method` selects the estimator: "fft" integrates the power over
+    a band of the full spectrum, while "goertzel" and "sinefit" only
+    evaluate the complex amplitude at exactly the requested frequency
+    (see `Goertzel` and `SineFit`). The single-bin estimators ignore
+    the bandwidth `delta`, and their power is only comparable to the
+    "fft" power when an input voltage is provided.
+
+    The spectra are computed once per instance and cached. Replacing
+    `voltageOut` or `voltageIn` invalidates the cache, modifying the
+    arrays in-place does not.
     """
 
     samplerate: int
     voltageOut: np.ndarray
     voltageIn: np.ndarray = None
+    method: str = "fft"
 
     def __post_init__(self):
-        self.timeArray = np.linspace(
-            1 / self.samplerate,
-            self.voltageOut.size / self.samplerate,
-            self.voltageOut.size,
+        assert self.method in ("fft", "goertzel", "sinefit"), (
+            f"{self.method} is not a recognized estimator."
+        )
+
+    def __setattr__(self, name, value):
+        # Replacing the voltages (or samplerate) invalidates the cached spectra
+        if name in ("samplerate", "voltageOut", "voltageIn"):
+            self.__dict__.pop("_cache", None)
+        super().__setattr__(name, value)
+
+    def _cached(self, key: str, compute):
+        """
+        Return `key` from the spectrum cache, computing it on first use
+        """
+        cache = self.__dict__.setdefault("_cache", {})
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    @property
+    def timeArray(self) -> np.ndarray:
+        """
+        Times at which the voltages were sampled, only created when needed
+        """
+        return self._cached(
+            "timeArray",
+            lambda: np.linspace(
+                1 / self.samplerate,
+                self.voltageOut.size / self.samplerate,
+                self.voltageOut.size,
+            ),
         )
 
+    @property
+    def fftFreqs(self) -> np.ndarray:
+        """
+        Non-negative Fourier frequencies of the cached spectra
+        """
+        return self._cached(
+            "fftFreqs", lambda: Bode.rfreqs(self.voltageOut, self.samplerate)
+        )
+
+    @property
+    def spectrumOut(self) -> np.ndarray:
+        """
+        Real-input Fourier transform of the output voltage
+        """
+        return self._cached("spectrumOut", lambda: Bode.RFFT(self.voltageOut))
+
+    @property
+    def spectrumIn(self) -> np.ndarray | None:
+        """
+        Real-input Fourier transform of the input voltage (None if not provided)
+        """
+        if self.voltageIn is None:
+            return None
+        return self._cached("spectrumIn", lambda: Bode.RFFT(self.voltageIn))
+
+    def _window(self, window: str) -> np.ndarray:
+        from scipy.signal import get_window
+
+        return self._cached(
+            ("window", window), lambda: get_window(window, self.voltageOut.size)
+        )
+
+    def _windowedSpectrum(self, key: str, voltage: np.ndarray, window: str):
+        """
+        Real-input Fourier transform of `voltage` weighted by `window`
+        """
+        return self._cached(
+            (key, window), lambda: Bode.RFFT(voltage * self._window(window))
+        )
+
+    def _cumulativePower(self, key: str, spectrum: np.ndarray) -> np.ndarray:
+        """
+        Cumulative integral of |spectrum|^2 over the Fourier frequencies,
+        such that the power in any band is the difference of two entries
+        """
+        from scipy.integrate import cumulative_trapezoid
+
+        def compute() -> np.ndarray:
+            with instrumentation.stage("bode.integrate", spectrum.size):
+                return cumulative_trapezoid(
+                    np.abs(spectrum) ** 2, self.fftFreqs, initial=0
+                )
+
+        return self._cached(key, compute)
+
+    def getAmplitudes(self, freqs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Complex amplitudes of the output and input voltages at exactly each
+        of `freqs`, using the single-bin estimator selected by `method`.
+        The input amplitudes are 1 if no input voltage is provided.
+        """
+        freqs = np.asarray(freqs, dtype=float)
+        voltages = self.voltageOut
+        if self.voltageIn is not None:
+            voltages = np.stack([self.voltageOut, self.voltageIn])
+
+        # Estimate both voltages in one pass, once per (method, frequency)
+        amplitudes = np.empty(freqs.shape + (2,), dtype=complex)
+        def estimate(f: float) -> np.ndarray:
+            with instrumentation.stage("bode.estimator", voltages.size):
+                estimator = Bode.estimator(self.method, f, self.samplerate)
+                return estimator.update(voltages).amplitude
+
+        for index, f in np.ndenumerate(freqs):
+            amplitudes[index] = self._cached((self.method, f), lambda: estimate(f))
+
+        if self.voltageIn is None:
+            return amplitudes[..., 0], 1.0
+        return amplitudes[..., 0], amplitudes[..., 1]
+
     @staticmethod
     def integral(x: np.ndarray, y: np.ndarray) -> float | np.ndarray:
+        from scipy.integrate import trapezoid
+
         return trapezoid(y, x)
 
     @staticmethod
@@ -38,30 +181,109 @@ class Bode:
         return np.fft.fftshift(np.fft.fftfreq(voltage.size, d=1 / samplerate))
 
     @staticmethod
-    def restrictPiPi(angle):
-        if angle > np.pi:
-            angle -= 2 * np.pi
-        if angle < -np.pi:
-            angle += 2 * np.pi
-        return angle
-    
+    def RFFT(voltage: np.ndarray) -> np.ndarray:
+        with instrumentation.stage("bode.fft", voltage.size, voltage.nbytes):
+            return np.fft.rfft(voltage)
+
+    @staticmethod
+    def rfreqs(voltage: np.ndarray, samplerate: int) -> np.ndarray:
+        return np.fft.rfftfreq(voltage.size, d=1 / samplerate)
+
+    @staticmethod
+    def bandIntegral(
+        freqs: np.ndarray, cumulative: np.ndarray, f: np.ndarray, delta: float
+    ) -> np.ndarray:
+        """
+        Integral over the open interval (f - delta, f + delta) from a
+        cumulative trapezoidal integral evaluated on the non-negative
+        `freqs` of a real signal. Parts of the interval below 0 Hz are
+        mirrored, as the spectrum is symmetric. A 2D `cumulative` is
+        integrated row-wise, with one `f` per row.
+        """
+        # First and last Fourier frequency strictly inside the interval
+        first = np.searchsorted(freqs, f - delta, side="right")
+        last = np.searchsorted(freqs, f + delta, side="left") - 1
+
+        # Intervals with fewer than two frequencies integrate to zero
+        first = np.minimum(first, freqs.size - 1)
+        last = np.maximum(last, first)
+
+        # Last frequency strictly below delta - f, integrated from 0 Hz. This
+        # is 0 Hz itself for intervals not reaching below 0 Hz.
+        mirrored = np.searchsorted(freqs, delta - f, side="left") - 1
+        mirrored = np.clip(mirrored, 0, freqs.size - 1)
+
+        if cumulative.ndim == 1:
+            return cumulative[last] - cumulative[first] + cumulative[mirrored]
+
+        def at(index: np.ndarray) -> np.ndarray:
+            return np.take_along_axis(cumulative, index[..., None], axis=-1)[..., 0]
+
+        return at(last) - at(first) + at(mirrored)
+
+    @staticmethod
+    def closestBin(freqs: np.ndarray, f: np.ndarray) -> np.ndarray:
+        """
+        Index of the positive Fourier frequency (discarding 0) in `freqs`
+        closest to each of `f`
+        """
+        positive = freqs[1:]
+        right = np.clip(np.searchsorted(positive, f), 1, positive.size - 1)
+        left = right - 1
+        closerLeft = np.abs(positive[left] - f) <= np.abs(positive[right] - f)
+
+        return np.where(closerLeft, left, right) + 1
+
+    @staticmethod
+    def estimator(method: str, f: float, samplerate: int):
+        match method:
+            case "goertzel":
+                return Goertzel(f, samplerate)
+            case "sinefit":
+                return SineFit(f, samplerate)
+            case _:
+                raise ValueError(f"{method} is not a single-bin estimator")
+
+    @staticmethod
+    def restrictPiPi(angle: float | np.ndarray) -> float | np.ndarray:
+        """
+        Wrap angle(s) into (-pi, pi]
+        """
+        angle = np.asarray(angle, dtype=float)
+        angle = np.where(angle > np.pi, angle - 2 * np.pi, angle)
+        angle = np.where(angle < -np.pi, angle + 2 * np.pi, angle)
+
+        return angle[()]
+
     def getPower(self, f: float, delta: float) -> float:
         """
         Calculate the power (ratio) using Parserval theorem
         """
+        return self.getPowers(f, delta)[()]
 
-        # Get Fourier frequencies in the interval 2*delta around f
-        freqs = Bode.freqs(self.voltageOut, self.samplerate)
-        interval = (freqs > f - delta) & (freqs < f + delta)
+    def getPowers(self, freqs: np.ndarray, delta: float) -> np.ndarray:
+        """
+        Calculate the power (ratio) in a band of 2*delta around each of `freqs`,
+        using the cached spectra
+        """
+        freqs = np.asarray(freqs, dtype=float)
+
+        with instrumentation.stage("bode.getPower", freqs.size):
+            return self._getPowers(freqs, delta)
 
-        # Get Fourier transform of output, and calculate power
-        FFTOUT = Bode.FFT(self.voltageOut)
-        powerOut = Bode.integral(freqs[interval], np.abs(FFTOUT[interval]) ** 2)
+    def _getPowers(self, freqs: np.ndarray, delta: float) -> np.ndarray:
+        if self.method != "fft":
+            amplitudeOut, amplitudeIn = self.getAmplitudes(freqs)
+            return np.abs(amplitudeOut) ** 2 / np.abs(amplitudeIn) ** 2
+
+        # Get power of output in the interval 2*delta around each frequency
+        cumulativeOut = self._cumulativePower("cumulativeOut", self.spectrumOut)
+        powerOut = Bode.bandIntegral(self.fftFreqs, cumulativeOut, freqs, delta)
 
         # Calculate power of input if provided, else set to 1.
         if self.voltageIn is not None:
-            FFTIN = Bode.FFT(self.voltageIn)
-            powerIn = Bode.integral(freqs[interval], np.abs(FFTIN[interval]) ** 2)
+            cumulativeIn = self._cumulativePower("cumulativeIn", self.spectrumIn)
+            powerIn = Bode.bandIntegral(self.fftFreqs, cumulativeIn, freqs, delta)
         else:
             powerIn = 1.0
 
@@ -71,27 +293,441 @@ class Bode:
         """
         Calculate the phase (ratio)
         """
+        return self.getPhases(f)[()]
+
+    def getPhases(self, freqs: np.ndarray) -> np.ndarray:
+        """
+        Calculate the phase (ratio) at the Fourier frequency closest to each
+        of `freqs`, using the cached spectra
+        """
+        freqs = np.asarray(freqs, dtype=float)
+
+        with instrumentation.stage("bode.getPhase", freqs.size):
+            return self._getPhases(freqs)
+
+    def _getPhases(self, freqs: np.ndarray) -> np.ndarray:
+        if self.method != "fft":
+            amplitudeOut, amplitudeIn = self.getAmplitudes(freqs)
+            return np.angle(amplitudeOut * np.conj(amplitudeIn))
+
+        # Find the closest positive Fourier frequency (discard 0)
+        closestIndex = Bode.closestBin(self.fftFreqs, freqs)
+
+        # Phase of the output relative to the input if provided. Taking the
+        # angle of the product keeps the result within (-pi, pi]
+        ratio = self.spectrumOut[closestIndex]
+        if self.voltageIn is not None:
+            ratio = ratio * np.conj(self.spectrumIn[closestIndex])
+
+        return np.angle(ratio)
+
+    def getHarmonics(
+        self,
+        fundamental: float,
+        harmonics: int = 10,
+        window: str = "blackmanharris",
+        lobe: int = 5,
+    ) -> Harmonics:
+        """
+        Gain and phase at the fundamental frequency and its harmonics, and
+        the THD and SINAD of the output, all from one cached spectrum
 
-        # Get the positive Fourier frequencies (discard 0)
-        freqs = Bode.freqs(self.voltageOut, self.samplerate)
+        Parameters
+        ----------
+        fundamental : float
+            Frequency of the fundamental, e.g. of a square wave stimulus.
+        harmonics : int, optional
+            Number of harmonics, including the fundamental. The default is 10.
+        window : str, optional
+            Window weighting the voltages, see `scipy.signal.get_window`.
+            Its sidelobes limit the SINAD that can be measured. The default
+            is "blackmanharris".
+        lobe : int, optional
+            Half-width in bins of the band around each harmonic over which
+            the power is summed, which should cover the main lobe of
+            `window`. This corrects the amplitudes for leakage, so they do
+            not depend on where a harmonic falls between two bins. The
+            default is 5.
 
-        positiveIndex = freqs > 0
-        closestIndex = abs(freqs[positiveIndex] - f).argmin()
+        Returns
+        -------
+        Harmonics
+            Amplitudes, gain (ratio) and phase (ratio) of every harmonic,
+            and the THD and SINAD of the output.
 
-        # Get Fourier transform of output, and calculate phase
-        FFTOUT = Bode.FFT(self.voltageOut)
-        phaseOut = np.angle(FFTOUT[positiveIndex][closestIndex])
+        """
+        with instrumentation.stage("bode.getHarmonics", harmonics):
+            spectrumOut = self._windowedSpectrum("windowedOut", self.voltageOut, window)
+            spectrumIn = None
+            if self.voltageIn is not None:
+                spectrumIn = self._windowedSpectrum(
+                    "windowedIn", self.voltageIn, window
+                )
+
+            return Bode.harmonics(
+                self.fftFreqs,
+                self._window(window),
+                spectrumOut,
+                spectrumIn,
+                fundamental,
+                harmonics,
+                lobe,
+            )
+
+    @staticmethod
+    def harmonics(
+        fftFreqs: np.ndarray,
+        weights: np.ndarray,
+        spectrumOut: np.ndarray,
+        spectrumIn: np.ndarray | None,
+        fundamental: float | np.ndarray,
+        harmonics: int,
+        lobe: int,
+    ) -> Harmonics:
+        """
+        Harmonic analysis of windowed spectra along the last axis, with one
+        fundamental per spectrum. See `getHarmonics`.
+        """
+        fundamental = np.asarray(fundamental, dtype=float)
+        binWidth = fftFreqs[1]
+        assert np.all(fundamental > 2 * lobe * binWidth), (
+            "Fundamental too low to separate the harmonics, use a longer capture."
+        )
+
+        freqs = fundamental[..., None] * np.arange(1, harmonics + 1)
+        centres = np.rint(freqs / binWidth).astype(int)
+        valid = centres + lobe < fftFreqs.size
+        centres = np.where(valid, centres, lobe)
+
+        # Power of a whole (main) lobe around every harmonic at once
+        indices = centres[..., None] + np.arange(-lobe, lobe + 1)
+        power = np.abs(spectrumOut) ** 2
+        powersOut = np.take_along_axis(power[..., None, :], indices, axis=-1)
+        powersOut = np.where(valid, powersOut.sum(axis=-1), np.nan)
+
+        # Amplitude of a sine with that power at the positive frequencies
+        normalisation = weights.size * np.sum(weights**2) / 4
+        amplitudeOut = np.sqrt(powersOut / normalisation)
+
+        # A (symmetric) window delays the phase by pi per bin that a
+        # harmonic lies above its closest bin
+        offset = np.exp(-1j * np.pi * (freqs / binWidth - centres))
+        peaksOut = np.take_along_axis(spectrumOut, centres, axis=-1) * offset
 
-        # Calculate phase of input if provided, else set to 0.
+        amplitudeIn, gain, phase = None, amplitudeOut, np.angle(peaksOut)
+        if spectrumIn is not None:
+            power = np.abs(spectrumIn) ** 2
+            powersIn = np.take_along_axis(power[..., None, :], indices, axis=-1)
+            powersIn = np.where(valid, powersIn.sum(axis=-1), np.nan)
+            amplitudeIn = np.sqrt(powersIn / normalisation)
+
+            # Window and leakage affect both voltages alike
+            peaksIn = np.take_along_axis(spectrumIn, centres, axis=-1) * offset
+            gain = amplitudeOut / amplitudeIn
+            phase = np.angle(peaksOut * np.conj(peaksIn))
+        phase = np.where(valid, phase, np.nan)
+
+        # Distortion relative to the fundamental, noise excluding DC
+        fundamentalPower = powersOut[..., 0]
+        distortion = np.nansum(powersOut[..., 1:], axis=-1)
+        total = np.sum(np.abs(spectrumOut[..., lobe + 1 :]) ** 2, axis=-1)
+        thd = np.sqrt(distortion / fundamentalPower)
+        sinad = 10 * np.log10(fundamentalPower / (total - fundamentalPower))
+
+        return Harmonics(
+            freqs, amplitudeOut, amplitudeIn, gain, phase, thd[()], sinad[()]
+        )
+
+    def getTransfer(self, freqs: np.ndarray) -> np.ndarray:
+        """
+        Calculate the complex transfer function (ratio) at the Fourier
+        frequency closest to each of `freqs`, using the cached spectra.
+        Meant for broadband stimuli (e.g. `MyDAQ.generateMultisine` or
+        `MyDAQ.generateChirp`) that excite all of `freqs` in one capture.
+        """
+        freqs = np.asarray(freqs, dtype=float)
+
+        if self.method != "fft":
+            amplitudeOut, amplitudeIn = self.getAmplitudes(freqs)
+            return amplitudeOut / amplitudeIn
+
+        closestIndex = Bode.closestBin(self.fftFreqs, freqs)
+        transfer = self.spectrumOut[closestIndex]
         if self.voltageIn is not None:
-            FFTIN = Bode.FFT(self.voltageIn)
-            phaseIn = np.angle(FFTIN[positiveIndex][closestIndex])
+            transfer = transfer / self.spectrumIn[closestIndex]
+
+        return transfer
+
+
+class Goertzel:
+    """
+    Single-bin DFT at an arbitrary frequency `f` using the Goertzel filter.
+    Voltages can be fed incrementally in chunks using `update`, with the
+    samples along the last axis. `amplitude` is the DFT of everything seen
+    so far at `f`, i.e. sum(x[n] * exp(-2j * pi * f * n / samplerate)).
+    """
+
+    def __init__(self, f: float, samplerate: int):
+        self.f = f
+        self.samplerate = samplerate
+        self.omega = 2 * np.pi * f / samplerate
+        self.reset()
+
+    def reset(self) -> None:
+        self.samples = 0
+        self.__state = None
+        self.__last = None
+
+    def update(self, chunk: np.ndarray) -> "Goertzel":
+        from scipy.signal import lfilter
+
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.shape[-1] == 0:
+            return self
+
+        if self.__state is None:
+            self.__state = np.zeros(chunk.shape[:-1] + (2,))
+            self.__last = np.zeros(chunk.shape[:-1] + (2,))
+
+        # s[n] = x[n] + 2 cos(omega) s[n - 1] - s[n - 2]
+        s, self.__state = lfilter(
+            [1.0],
+            [1.0, -2 * np.cos(self.omega), 1.0],
+            chunk,
+            axis=-1,
+            zi=self.__state,
+        )
+
+        # Keep the two most recent values of s[n], possibly across chunks
+        self.__last = np.concatenate([self.__last, s[..., -2:]], axis=-1)[..., -2:]
+        self.samples += chunk.shape[-1]
+
+        return self
+
+    @property
+    def amplitude(self) -> complex | np.ndarray:
+        # X(f) = exp(-j omega (N - 1)) * (s[N - 1] - exp(-j omega) s[N - 2])
+        if self.samples == 0:
+            return 0j
+        s1, s2 = self.__last[..., -1], self.__last[..., -2]
+        y = s1 - np.exp(-1j * self.omega) * s2
+
+        return (np.exp(-1j * self.omega * (self.samples - 1)) * y)[()]
+
+
+class SineFit:
+    """
+    Least-squares fit of a * cos(w t) + b * sin(w t) + c at a known
+    frequency `f`. Voltages can be fed incrementally in chunks using
+    `update`, with the samples along the last axis, as only the normal
+    equations are accumulated. `amplitude` is the fitted phasor a - 1j * b,
+    with the same phase convention as the DFT.
+    """
+
+    def __init__(self, f: float, samplerate: int):
+        self.f = f
+        self.samplerate = samplerate
+        self.omega = 2 * np.pi * f / samplerate
+        self.reset()
+
+    def reset(self) -> None:
+        self.samples = 0
+        self.__normal = np.zeros((3, 3))
+        self.__projection = 0.0
+
+    def update(self, chunk: np.ndarray) -> "SineFit":
+        chunk = np.asarray(chunk, dtype=float)
+
+        phase = self.omega * np.arange(self.samples, self.samples + chunk.shape[-1])
+        basis = np.stack([np.cos(phase), np.sin(phase), np.ones_like(phase)])
+
+        self.__normal = self.__normal + basis @ basis.T
+        self.__projection = self.__projection + chunk @ basis.T
+        self.samples += chunk.shape[-1]
+
+        return self
+
+    @property
+    def amplitude(self) -> complex | np.ndarray:
+        if self.samples == 0:
+            return 0j
+
+        # Least squares solution of the accumulated normal equations
+        coefficients = np.linalg.lstsq(
+            self.__normal, np.transpose(self.__projection), rcond=None
+        )[0].T
+
+        return (coefficients[..., 0] - 1j * coefficients[..., 1])[()]
+
+
+def batchBode(
+    samplerate: int,
+    freqs: np.ndarray,
+    voltageOut: np.ndarray,
+    voltageIn: np.ndarray = None,
+    delta: float = 1,
+    batchSize: int = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Extract bode plot information for a whole sweep at once
+
+    Parameters
+    ----------
+    samplerate : int
+        Samplerate with which the voltages were sampled.
+    freqs : ndarray
+        Stimulus frequency of each capture, shape (n_freqs,).
+    voltageOut : ndarray
+        Output voltages, shape (n_freqs, n_samples).
+    voltageIn : ndarray, optional
+        Input voltages, shape (n_freqs, n_samples). If not provided, the
+        magnitude and phase are of the output only (cf. `Bode`).
+    delta : float, optional
+        Half-width of the band over which the power is integrated.
+        The default is 1.
+    batchSize : int, optional
+        Number of captures transformed at once, to bound the memory used
+        by the spectra. The default is all of them.
+
+    Returns
+    -------
+    magnitude : ndarray
+        Magnitude (ratio) at each frequency, i.e. the square root of
+        `Bode.getPower`.
+    phase : ndarray
+        Phase (ratio) at each frequency, wrapped into (-pi, pi].
+
+    """
+    from scipy.integrate import cumulative_trapezoid
+
+    freqs = np.asarray(freqs, dtype=float)
+    voltageOut = np.atleast_2d(voltageOut)
+    if voltageIn is not None:
+        voltageIn = np.atleast_2d(voltageIn)
+        assert voltageIn.shape == voltageOut.shape, "Voltages should have equal shapes."
+    assert freqs.shape == voltageOut.shape[:1], "Expected one frequency per capture."
+
+    fftFreqs = Bode.rfreqs(voltageOut[0], samplerate)
+    closestIndex = Bode.closestBin(fftFreqs, freqs)
+
+    powers = np.empty(freqs.size)
+    phases = np.empty(freqs.size)
+    batchSize = batchSize or freqs.size
+
+    for start in range(0, freqs.size, batchSize):
+        batch = slice(start, start + batchSize)
+        rows = np.arange(freqs[batch].size)
+
+        # One batched transform (and band integration) along the last axis
+        FFTOUT = np.fft.rfft(voltageOut[batch], axis=-1)
+        cumulativeOut = cumulative_trapezoid(
+            np.abs(FFTOUT) ** 2, fftFreqs, axis=-1, initial=0
+        )
+        powerOut = Bode.bandIntegral(fftFreqs, cumulativeOut, freqs[batch], delta)
+        phaseOut = np.angle(FFTOUT[rows, closestIndex[batch]])
+
+        # Calculate power and phase of input if provided, else set to 1 and 0.
+        if voltageIn is not None:
+            FFTIN = np.fft.rfft(voltageIn[batch], axis=-1)
+            cumulativeIn = cumulative_trapezoid(
+                np.abs(FFTIN) ** 2, fftFreqs, axis=-1, initial=0
+            )
+            powerIn = Bode.bandIntegral(fftFreqs, cumulativeIn, freqs[batch], delta)
+            phaseIn = np.angle(FFTIN[rows, closestIndex[batch]])
         else:
+            powerIn = 1.0
             phaseIn = 0.0
 
-        phase = phaseOut - phaseIn
-        # We are not interested in angles outside (-pi, pi]
-        return Bode.restrictPiPi(phase)
+        powers[batch] = powerOut / powerIn
+        phases[batch] = phaseOut - phaseIn
+
+    # We are not interested in angles outside (-pi, pi]
+    return np.sqrt(powers), Bode.restrictPiPi(phases)
+
+
+def batchHarmonics(
+    samplerate: int,
+    fundamental: float | np.ndarray,
+    voltageOut: np.ndarray,
+    voltageIn: np.ndarray = None,
+    harmonics: int = 10,
+    window: str = "blackmanharris",
+    lobe: int = 5,
+    batchSize: int = None,
+) -> Harmonics:
+    """
+    Harmonic analysis (see `Bode.getHarmonics`) of many captures at once
+
+    Parameters
+    ----------
+    samplerate : int
+        Samplerate with which the voltages were sampled.
+    fundamental : float or ndarray
+        Fundamental frequency of all captures, or of each capture.
+    voltageOut : ndarray
+        Output voltages, shape (n_captures, n_samples).
+    voltageIn : ndarray, optional
+        Input voltages, shape (n_captures, n_samples). If not provided, the
+        gain and phase are of the output only (cf. `Bode`).
+    harmonics : int, optional
+        Number of harmonics, including the fundamental. The default is 10.
+    window : str, optional
+        Window weighting the voltages. The default is "blackmanharris".
+    lobe : int, optional
+        Half-width in bins of the band summed around each harmonic.
+        The default is 5.
+    batchSize : int, optional
+        Number of captures transformed at once, to bound the memory used
+        by the spectra. The default is all of them.
+
+    Returns
+    -------
+    Harmonics
+        With a first axis of length n_captures on all fields.
+
+    """
+    from scipy.signal import get_window
+
+    voltageOut = np.atleast_2d(voltageOut)
+    if voltageIn is not None:
+        voltageIn = np.atleast_2d(voltageIn)
+        assert voltageIn.shape == voltageOut.shape, "Voltages should have equal shapes."
+
+    captures = voltageOut.shape[0]
+    fundamental = np.broadcast_to(np.asarray(fundamental, dtype=float), (captures,))
+
+    fftFreqs = Bode.rfreqs(voltageOut[0], samplerate)
+    weights = get_window(window, voltageOut.shape[-1])
+    batchSize = batchSize or captures
+
+    results = []
+    for start in range(0, captures, batchSize):
+        batch = slice(start, start + batchSize)
+
+        # One batched transform along the last axis
+        spectrumOut = np.fft.rfft(voltageOut[batch] * weights, axis=-1)
+        spectrumIn = None
+        if voltageIn is not None:
+            spectrumIn = np.fft.rfft(voltageIn[batch] * weights, axis=-1)
+
+        results.append(
+            Bode.harmonics(
+                fftFreqs,
+                weights,
+                spectrumOut,
+                spectrumIn,
+                fundamental[batch],
+                harmonics,
+                lobe,
+            )
+        )
+
+    def join(name: str) -> np.ndarray | None:
+        if getattr(results[0], name) is None:
+            return None
+        return np.concatenate([np.atleast_1d(getattr(r, name)) for r in results])
+
+    return Harmonics(*(join(field.name) for field in fields(Harmonics)))
 
 
 def plotBode(
@@ -100,47 +736,24 @@ def plotBode(
     phase: np.ndarray,
     save: str = None,
     analytic: np.ndarray = None,
+    show: bool = True,
+    points: int = None,
     **kwargs
 ) -> None:
-
-    # Use GridSpec to nicely center subplots
-    gs = GridSpec(2, 4)
+    """
+    Plot the magnitude and phase of a sweep, saving the figure to `save` if
+    provided. For dense sweeps, the measured points are decimated to about
+    `points` points. See `span.plotting` for live and background plotting.
+    """
+    # Plotting is only needed interactively, so import matplotlib on first use
+    from matplotlib import pyplot as plt
+    from span.plotting import drawBode
 
     # Create figure and axes
-    fig = plt.figure(figsize=(10,7))
-    magAx = fig.add_subplot(gs[0, :2])
-    phaseAx = fig.add_subplot(gs[0, 2:])
-    polarAx = fig.add_subplot(gs[1, 1:3], projection="polar")
-
-    # Plot data
-    magAx.scatter(freqs, 20 * np.log10(abs(mag)), s=4, c="k", label="Measured")
-    phaseAx.scatter(freqs, phase, s=4, c="k")
-    polarAx.scatter(phase, mag, s=4, c="k")
-
-    # Add labels
-    magAx.set_xlabel("Frequency [rad s$^{-1}$]")
-    magAx.set_ylabel("log$_{10}$|H($\omega$)|")
-    phaseAx.set_xlabel("Frequency [rad s$^{-1}$]")
-    phaseAx.set_ylabel("Arg(H($\omega$)")
-    polarAx.set_xlabel("$\phi$")
-    polarAx.set_ylabel("$\omega$")
-
-    # Convert to logarithmic axes
-    magAx.set_xscale("log")
-    phaseAx.set_xscale("log")
-
-    # Add grid
-    magAx.grid(alpha=0.5)
-    phaseAx.grid(alpha=0.5)
-    polarAx.grid(alpha=0.5)
-
-    # Add analytic if provided
-    if not (analytic is None):
-        magAx.plot(freqs, 20 * np.log10(abs(analytic)), c="r", label="Analytic")
-        phaseAx.plot(freqs, np.angle(analytic), c="r")
-        polarAx.plot(np.angle(analytic), abs(analytic), c="r")
-
-        magAx.legend()
-
-    plt.tight_layout()
-    plt.show()
+    fig = plt.figure(figsize=(10, 7))
+    drawBode(fig, freqs, mag, phase, analytic=analytic, points=points)
+
+    if save is not None:
+        fig.savefig(save)
+    if show:
+        plt.show()
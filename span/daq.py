@@ -1,13 +1,267 @@
+from __future__ import annotations
+import asyncio
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from fractions import Fraction
+from itertools import chain
+from threading import Event, Lock, Semaphore
+from typing import TYPE_CHECKING
 import numpy as np
-import nidaqmx as dx
-from scipy.signal import sawtooth, square
-from time import sleep
+from span.instrumentation import instrumentation
+from span.recording import Recording, RecordingWriter
+from span.trigger import RingBuffer, Trigger, TriggerEvent
+from time import perf_counter, sleep
 
+# nidaqmx is only imported by `NIDAQmxBackend`, so it is not needed for analysis
+if TYPE_CHECKING:
+    import nidaqmx as dx
+    from nidaqmx.stream_readers import AnalogMultiChannelReader
+    from nidaqmx.stream_writers import AnalogMultiChannelWriter
+
+
+class NIDAQmxBackend:
+    """
+    Backend driving the MyDAQ through nidaqmx. Any object providing the same
+    attributes (e.g. `span.simulation.SimulatedBackend`) can be passed to
+    `MyDAQ` instead. nidaqmx is imported when the backend is created, rather
+    than when `span.daq` is imported.
+    """
+
+    def __init__(self):
+        import nidaqmx
+        from nidaqmx.stream_readers import AnalogMultiChannelReader
+        from nidaqmx.stream_writers import AnalogMultiChannelWriter
+
+        self.__nidaqmx = nidaqmx
+        self.__reader = AnalogMultiChannelReader
+        self.__writer = AnalogMultiChannelWriter
+
+        acquisition = nidaqmx.constants.AcquisitionType
+        regeneration = nidaqmx.constants.RegenerationMode
+        self.FINITE = acquisition.FINITE
+        self.CONTINUOUS = acquisition.CONTINUOUS
+        self.ALLOW_REGENERATION = regeneration.ALLOW_REGENERATION
+        self.DONT_ALLOW_REGENERATION = regeneration.DONT_ALLOW_REGENERATION
+
+    def Task(self, name: str = "") -> dx.task.Task:
+        return self.__nidaqmx.Task(name)
+
+    def reader(self, task: dx.task.Task) -> AnalogMultiChannelReader:
+        return self.__reader(task.in_stream)
+
+    def writer(self, task: dx.task.Task) -> AnalogMultiChannelWriter:
+        return self.__writer(task.out_stream, auto_start=False)
+
+    def commit(self, task: dx.task.Task) -> None:
+        task.control(self.__nidaqmx.constants.TaskMode.TASK_COMMIT)
+
+
+class BufferPool:
+    """
+    Pool of reusable float64 buffers, keyed by shape. Pass a buffer from `get`
+    as `out` to `MyDAQ.read` or `MyDAQ.readwrite`, and `release` it once its
+    data is no longer needed so that the next read of that shape reuses it.
+    """
 
-class MyDAQ:
     def __init__(self):
+        self.__free = {}
+
+    def get(self, shape: tuple[int, ...]) -> np.ndarray:
+        free = self.__free.get(tuple(shape))
+        if free:
+            return free.pop()
+        return np.empty(shape)
+
+    def release(self, buffer: np.ndarray) -> None:
+        self.__free.setdefault(buffer.shape, []).append(buffer)
+
+
+class WaveformCache:
+    """
+    Least-recently-used cache of generated waveforms, evicting the oldest
+    entries once the cached arrays exceed `maxBytes` in total. Cached arrays
+    are read-only, as they are shared between all callers (and threads).
+    """
+
+    def __init__(self, maxBytes: int = 256 * 2**20):
+        self.maxBytes = maxBytes
+        self.nbytes = 0
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key) -> np.ndarray | None:
+        with self.__lock:
+            array = self.__entries.get(key)
+            if array is not None:
+                self.__entries.move_to_end(key)
+            return array
+
+    def put(self, key, array: np.ndarray) -> np.ndarray:
+        """
+        Cache `array` under `key`, returning the cached array. If another
+        caller stored `key` first, that array is returned instead.
+        """
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                return self.__entries[key]
+            if array.nbytes > self.maxBytes:
+                return array
+
+            array.setflags(write=False)
+            self.__entries[key] = array
+            self.nbytes += array.nbytes
+
+            while self.nbytes > self.maxBytes:
+                __, evicted = self.__entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+            return array
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.nbytes = 0
+
+
+# scipy.signal is slow to import, so only import it once a waveform needs it
+def _square(phase: np.ndarray) -> np.ndarray:
+    from scipy.signal import square
+
+    return square(phase)
+
+
+def _sawtooth(phase: np.ndarray, width: float = 1) -> np.ndarray:
+    from scipy.signal import sawtooth
+
+    return sawtooth(phase, width=width)
+
+
+# Basic waveforms, as a function of time, amplitude, frequency and phase
+WAVEFORMS = {
+    "sine": lambda x, A, f, p: A * np.sin(2 * np.pi * f * x + p),
+    "square": lambda x, A, f, p: A * _square(2 * np.pi * f * x + p),
+    "sawtooth": lambda x, A, f, p: A * _sawtooth(2 * np.pi * f * x + p),
+    "isawtooth": lambda x, A, f, p: A * _sawtooth(2 * np.pi * f * x + p, width=0),
+    "triangle": lambda x, A, f, p: A * _sawtooth(2 * np.pi * f * x + p, width=0.5),
+}
+
+
+class OutputHandle:
+    """
+    Handle on output that keeps running in the background, see
+    `MyDAQ.writeLooped`. Call `stop` (or leave the `with` block) to stop it.
+    """
+
+    def __init__(self, task: dx.task.Task):
+        self.__task = task
+
+    @property
+    def running(self) -> bool:
+        return self.__task is not None
+
+    def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.stop()
+            self.__task.close()
+            self.__task = None
+
+    def __enter__(self) -> "OutputHandle":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+@dataclass
+class CallTiming:
+    """
+    Time spent in a `MyDAQ` call on setting up and tearing down tasks,
+    versus on the acquisition itself
+    """
+
+    call: str
+    setup: float
+    acquisition: float
+
+
+class Session:
+    """
+    Keeps the tasks of a `MyDAQ` alive between calls. Use as
+
+        with daq.session() as session:
+            ...
+
+    within which `read`, `write` and `readwrite` reuse one input and one
+    output task. Channels are only re-added when they change, and timing
+    is only reconfigured (and the task re-committed) when the samplerate
+    or number of samples changes. The setup and acquisition time of
+    every call is collected in `timings`.
+    """
+
+    def __init__(self, daq: "MyDAQ"):
+        self.daq = daq
+        self.timings = []
+        self.__tasks = {}
+
+    def task(
+        self, channels: str | list[str], samples: int, output: bool = False
+    ) -> dx.task.Task:
+        """
+        Configured (and committed) task for `channels` and `samples`
+        """
+        direction = "output" if output else "input"
+        channels = (channels,) if isinstance(channels, str) else tuple(channels)
+        timing = (self.daq.samplerate, samples)
+
+        currentChannels, currentTiming, task = self.__tasks.get(
+            direction, (None, None, None)
+        )
+
+        # Only one task per direction, as committed tasks reserve the channels
+        if currentChannels != channels:
+            if task is not None:
+                task.close()
+
+            with instrumentation.stage("task.create"):
+                task = self.daq.backend.Task(
+                    self.daq._taskName(f"session{direction.title()}")
+                )
+            if output:
+                self.daq._addOutputChannels(task, channels)
+            else:
+                self.daq._addInputChannels(task, channels)
+            currentTiming = None
+
+        if currentTiming != timing:
+            self.daq._configureChannelTimings(task, samples)
+            with instrumentation.stage("task.commit"):
+                self.daq.backend.commit(task)
+
+        self.__tasks[direction] = (channels, timing, task)
+
+        return task
+
+    def close(self) -> None:
+        for __, __, task in self.__tasks.values():
+            task.close()
+        self.__tasks.clear()
+
+
+class MyDAQ:
+    # Shared by all instances, as generating waveforms does not need a device
+    waveformCache = WaveformCache()
+
+    def __init__(self, backend=None):
         self.__samplerate = None
         self.__name = None
+        self.__backend = NIDAQmxBackend() if backend is None else backend
+        self.__session = None
+        self.__writer = None
+        self.lastTiming = None
 
     @property
     def samplerate(self) -> int:
@@ -19,6 +273,10 @@ class MyDAQ:
         assert newSamplerate > 0, "Samplerate should be positive."
         self.__samplerate = newSamplerate
 
+    @property
+    def backend(self):
+        return self.__backend
+
     @property
     def name(self) -> str:
         return self.__name
@@ -39,11 +297,12 @@ class MyDAQ:
             channels = [channels]
 
         # Iterate over all channels and add to task
-        for channel in channels:
-            if self.name in channel:
-                task.ao_channels.add_ao_voltage_chan(channel)
-            else:
-                task.ao_channels.add_ao_voltage_chan(f"{self.name}/{channel}")
+        with instrumentation.stage("task.channels"):
+            for channel in channels:
+                if self.name in channel:
+                    task.ao_channels.add_ao_voltage_chan(channel)
+                else:
+                    task.ao_channels.add_ao_voltage_chan(f"{self.name}/{channel}")
 
     def _addInputChannels(self, task: dx.task.Task, channels: str | list[str]) -> None:
         """
@@ -56,23 +315,121 @@ class MyDAQ:
             channels = [channels]
 
         # Iterate over all channels and add to task
-        for channel in channels:
-            if self.name in channel:
-                task.ai_channels.add_ai_voltage_chan(channel)
-            else:
-                task.ai_channels.add_ai_voltage_chan(f"{self.name}/{channel}")
+        with instrumentation.stage("task.channels"):
+            for channel in channels:
+                if self.name in channel:
+                    task.ai_channels.add_ai_voltage_chan(channel)
+                else:
+                    task.ai_channels.add_ai_voltage_chan(f"{self.name}/{channel}")
 
-    def _configureChannelTimings(self, task: dx.task.Task, samples: int) -> None:
+    def _configureChannelTimings(
+        self, task: dx.task.Task, samples: int, continuous: bool = False
+    ) -> None:
         """
-        Set the correct timings for task based on number of samples
+        Set the correct timings for task based on number of samples.
+        For continuous tasks, `samples` sets the size of the device buffer.
         """
         assert not (self.samplerate is None), "Samplerate should be set first."
 
-        task.timing.cfg_samp_clk_timing(
-            self.samplerate,
-            sample_mode=dx.constants.AcquisitionType.FINITE,
-            samps_per_chan=samples,
+        mode = self.backend.CONTINUOUS if continuous else self.backend.FINITE
+        with instrumentation.stage("task.timing"):
+            task.timing.cfg_samp_clk_timing(
+                self.samplerate, sample_mode=mode, samps_per_chan=samples
+            )
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """
+        Keep tasks alive between calls, see `Session`
+        """
+        assert self.__session is None, "A session is already active."
+
+        self.__session = Session(self)
+        try:
+            yield self.__session
+        finally:
+            self.__session.close()
+            self.__session = None
+
+    @contextmanager
+    def _task(
+        self,
+        name: str,
+        channels: str | list[str],
+        samples: int,
+        output: bool = False,
+        shared: bool = True,
+    ) -> Iterator[dx.task.Task]:
+        """
+        Configured task for `channels`, taken from the active session if any
+        (and `shared` is set)
+        """
+        if shared and self.__session is not None:
+            task = self.__session.task(channels, samples, output=output)
+            try:
+                yield task
+            finally:
+                # Return to the committed state, ready for the next call
+                task.stop()
+            return
+
+        with instrumentation.stage("task.create"):
+            task = self.backend.Task(self._taskName(name))
+
+        try:
+            if output:
+                self._addOutputChannels(task, channels)
+            else:
+                self._addInputChannels(task, channels)
+            self._configureChannelTimings(task, samples)
+
+            yield task
+        finally:
+            with instrumentation.stage("task.close"):
+                task.close()
+
+    def _taskName(self, name: str) -> str:
+        """
+        Name of a task of this device. DAQmx requires the names of live tasks
+        to be unique, also across devices (e.g. in a `DAQGroup`).
+        """
+        return f"{self.name}/{name}"
+
+    def _recordTiming(self, call: str, start: float, acquisition: float) -> None:
+        """
+        Record the time spent in `call` since `start`, `acquisition` of which
+        was spent acquiring
+        """
+        total = perf_counter() - start
+        self.lastTiming = CallTiming(call, total - acquisition, acquisition)
+        instrumentation.record(call, total)
+
+        if self.__session is not None:
+            self.__session.timings.append(self.lastTiming)
+
+    @staticmethod
+    def _readBuffer(channels: int, samples: int, out: np.ndarray = None) -> np.ndarray:
+        """
+        Buffer of shape (channels, samples) for a stream reader to read into.
+        Uses `out` if provided, which should be C-contiguous float64.
+        """
+        if out is None:
+            return np.empty((channels, samples))
+
+        assert out.dtype == np.float64, "out should be a float64 array."
+        assert out.flags.c_contiguous, "out should be C-contiguous."
+        assert out.size == channels * samples, (
+            f"out should hold {channels} x {samples} samples."
         )
+        return out.reshape(channels, samples)
+
+    @staticmethod
+    def _writeBuffer(voltages: np.ndarray) -> np.ndarray:
+        """
+        Voltages as a C-contiguous float64 array of shape (channels, samples),
+        as required by the stream writer. Only copies if necessary.
+        """
+        return np.ascontiguousarray(np.atleast_2d(voltages), dtype=np.float64)
 
     @staticmethod
     def convertDurationToSamples(samplerate: int, duration: float) -> int:
@@ -87,41 +444,369 @@ class MyDAQ:
 
         return duration
 
-    def read(self, duration: float, *channels: str, timeout: float = 300) -> np.ndarray:
+    def read(
+        self,
+        duration: float,
+        *channels: str,
+        timeout: float = 300,
+        out: np.ndarray = None,
+    ) -> np.ndarray:
         """
-        Read from user-specified channels for `duration` seconds
+        Read from user-specified channels for `duration` seconds.
+        The samples are read directly into `out` if provided.
         """
 
         # Convert duration to samples
         samples = MyDAQ.convertDurationToSamples(self.samplerate, duration)
+        data = MyDAQ._readBuffer(len(channels), samples, out)
 
         # Create read task
-        with dx.Task("readOnly") as readTask:
-            self._addInputChannels(readTask, channels)
-            self._configureChannelTimings(readTask, samples)
-
+        start = perf_counter()
+        with self._task("readOnly", channels, samples) as readTask:
             # Now read in data. Use WAIT_INFINITELY to assure ample reading time
-            data = readTask.read(number_of_samples_per_channel=samples, timeout=timeout)
+            acquisition = perf_counter()
+            reader = self.backend.reader(readTask)
+            with instrumentation.stage("read.transfer", data.size, data.nbytes):
+                reader.read_many_sample(
+                    data, number_of_samples_per_channel=samples, timeout=timeout
+                )
+            acquisition = perf_counter() - acquisition
+
+        self._recordTiming("read", start, acquisition)
+
+        return data[0] if len(channels) == 1 else data
+
+    def stream(
+        self,
+        chunkSize: int,
+        *channels: str,
+        chunks: int = None,
+        buffers: int = 2,
+        timeout: float = 10,
+    ) -> Iterator[np.ndarray]:
+        """
+        Continuously read from user-specified channels, yielding `chunkSize`
+        samples per channel at a time, until `chunks` chunks were read
+        (or indefinitely if not provided).
+
+        Samples are read straight into a ring of `buffers` preallocated
+        arrays, and the yielded chunks are views into those. A chunk is
+        therefore overwritten `buffers` chunks later; copy it to keep it.
+        """
+        assert chunkSize > 0, "Chunk size should be positive."
+        assert buffers > 0, "Number of buffers should be positive."
+
+        pool = np.zeros((buffers, len(channels), chunkSize))
+
+        with self.backend.Task(self._taskName("stream")) as streamTask:
+            self._addInputChannels(streamTask, channels)
+
+            # Leave the device ample buffer space between two reads
+            self._configureChannelTimings(streamTask, 10 * chunkSize, continuous=True)
+
+            reader = self.backend.reader(streamTask)
+            streamTask.start()
+
+            count = 0
+            while chunks is None or count < chunks:
+                buffer = pool[count % buffers]
+                reader.read_many_sample(
+                    buffer, number_of_samples_per_channel=chunkSize, timeout=timeout
+                )
+                count += 1
 
-        return np.asarray(data)
+                # Mimic `read`, which returns a 1D array for a single channel
+                yield buffer[0] if len(channels) == 1 else buffer
 
-    def write(self, voltages: np.ndarray, *channels: str) -> None:
+    async def astream(
+        self,
+        chunkSize: int,
+        *channels: str,
+        chunks: int = None,
+        buffers: int = 2,
+        timeout: float = 10,
+    ) -> AsyncIterator[np.ndarray]:
+        """
+        Asynchronous version of `stream`. The whole stream runs in a worker
+        thread, so the event loop is free while waiting for the next chunk.
+        Cancelling stops the stream after the read in progress.
         """
-        Write `voltages` to user-specified channels.
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = Event()
+
+        # Read at most one chunk ahead, into one more buffer, so chunks stay
+        # valid for as long as with `stream`
+        credits = Semaphore(2)
+
+        def produce() -> None:
+            generator = self.stream(
+                chunkSize,
+                *channels,
+                chunks=chunks,
+                buffers=buffers + 1,
+                timeout=timeout,
+            )
+            try:
+                with closing(generator):
+                    while not stop.is_set():
+                        if not credits.acquire(timeout=0.05):
+                            continue
+                        chunk = next(generator, None)
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                        if chunk is None:
+                            return
+            except Exception as error:
+                loop.call_soon_threadsafe(queue.put_nowait, error)
+
+        worker = asyncio.ensure_future(asyncio.to_thread(produce))
+        try:
+            while (chunk := await queue.get()) is not None:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+                credits.release()
+        finally:
+            # Wait for the read in progress, so the task is closed on return
+            stop.set()
+            await worker
+
+    def record(
+        self,
+        path: str,
+        duration: float,
+        *channels: str,
+        chunkSize: int = None,
+        dtype: np.dtype = np.float64,
+        index: bool = True,
+        timeout: float = 10,
+    ) -> Recording:
         """
+        Read from user-specified channels for `duration` seconds straight
+        to a recording at `path`, rather than into memory. Samples are
+        streamed in chunks of `chunkSize` samples per channel (a tenth of a
+        second by default). See `RecordingWriter` for the file format.
+        """
+        samples = MyDAQ.convertDurationToSamples(self.samplerate, duration)
+        chunkSize = chunkSize or max(self.samplerate // 10, 1)
+        chunks = -(-samples // chunkSize)
+
+        with RecordingWriter(
+            path, self.samplerate, channels, self.name, dtype, index
+        ) as writer:
+            recorded = 0
+            stream = self.stream(chunkSize, *channels, chunks=chunks, timeout=timeout)
+            for chunk in stream:
+                # The last chunk may hold more samples than requested
+                writer.write(np.atleast_2d(chunk)[:, : samples - recorded])
+                recorded += chunkSize
+
+        return Recording(path)
+
+    def triggered(
+        self,
+        trigger: Trigger,
+        *channels: str,
+        pre: float = 0,
+        post: float = 0.1,
+        events: int = None,
+        chunkSize: int = None,
+        timeout: float = 10,
+    ) -> Iterator[TriggerEvent]:
+        """
+        Continuously read from user-specified channels, yielding a
+        `TriggerEvent` with `pre` seconds before and `post` seconds after
+        every time `trigger` fires, until `events` events were yielded (or
+        indefinitely if not provided).
+
+        Samples are streamed in chunks of `chunkSize` samples per channel (a
+        tenth of a second by default) into a ring buffer just large enough
+        to hold the windows, so memory use is constant however long it runs.
+        The trigger is evaluated on each chunk as a whole, and only the
+        window around each trigger is copied out of the buffer. Triggers
+        within `post` seconds of the previous one are ignored (unless the
+        trigger has a longer holdoff).
+        """
+        preSamples = MyDAQ.convertDurationToSamples(self.samplerate, pre)
+        postSamples = MyDAQ.convertDurationToSamples(self.samplerate, post)
+        chunkSize = chunkSize or max(self.samplerate // 10, 1)
+
+        # Leave the holdoff of the caller's trigger as it is
+        trigger.reset()
+        holdoff = max(trigger.holdoff, postSamples)
+        ring = RingBuffer(len(channels), preSamples + postSamples + chunkSize)
+        pending = []
+        count = 0
+
+        for chunk in self.stream(chunkSize, *channels, timeout=timeout):
+            pending.extend(trigger.find(chunk, ring.total, holdoff).tolist())
+            ring.write(chunk)
+
+            # Yield the triggers of which the whole window has been acquired
+            while pending and pending[0] + postSamples <= ring.total:
+                sample = pending.pop(0)
+                start = max(sample - preSamples, ring.first)
+                yield TriggerEvent(
+                    sample,
+                    MyDAQ.convertSamplesToDuration(self.samplerate, sample),
+                    sample - start,
+                    ring.window(start, sample + postSamples),
+                )
+
+                count += 1
+                if events is not None and count >= events:
+                    return
+
+    def write(self, voltages: np.ndarray, *channels: str, timeout: float = 300) -> None:
+        """
+        Write `voltages` to user-specified channels, returning once the
+        device has finished generating them.
+        """
+        self.__write(voltages, channels, timeout)
+
+    def __write(
+        self,
+        voltages: np.ndarray,
+        channels: tuple[str, ...],
+        timeout: float,
+        shared: bool = True,
+    ) -> None:
         samples = max(voltages.shape)
 
         # Create write task
-        with dx.Task("writeOnly") as writeTask:
-            self._addOutputChannels(writeTask, channels)
-            self._configureChannelTimings(writeTask, samples)
-
+        start = perf_counter()
+        with self._task(
+            "writeOnly", channels, samples, output=True, shared=shared
+        ) as writeTask:
             # Now write the data
-            writeTask.write(voltages, auto_start=True)
+            acquisition = perf_counter()
+            writer = self.backend.writer(writeTask)
+            buffer = MyDAQ._writeBuffer(voltages)
+            with instrumentation.stage("write.transfer", buffer.size, buffer.nbytes):
+                writer.write_many_sample(buffer)
+            writeTask.start()
 
-            # Wait for writing to finish
-            sleep(samples / self.samplerate + 1 / 1000)
+            # Wait for the device to report writing has finished
+            with instrumentation.stage("write.wait"):
+                writeTask.wait_until_done(timeout=timeout)
             writeTask.stop()
+            acquisition = perf_counter() - acquisition
+
+        self._recordTiming("write", start, acquisition)
+
+    def writeAsync(
+        self, voltages: np.ndarray, *channels: str, timeout: float = 300
+    ) -> Future:
+        """
+        Non-blocking version of `write`, returning a future that completes
+        once the device has finished generating `voltages`. Writes are
+        queued, and played one after the other in the order they were made.
+        They use a task of their own, never that of an active session, which
+        is only meant for the calling thread. See `close`.
+        """
+        if self.__writer is None:
+            self.__writer = ThreadPoolExecutor(max_workers=1)
+
+        return self.__writer.submit(
+            self.__write, voltages, channels, timeout, shared=False
+        )
+
+    def close(self) -> None:
+        """
+        Wait for the queued `writeAsync` writes, and stop their worker thread
+        """
+        if self.__writer is not None:
+            self.__writer.shutdown()
+            self.__writer = None
+
+    def __enter__(self) -> "MyDAQ":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def writeLooped(self, voltages: np.ndarray, *channels: str) -> OutputHandle:
+        """
+        Repeat `voltages` on user-specified channels until the returned
+        handle is stopped. Only `voltages` (e.g. one or a few periods) are
+        written to the device, which regenerates them by itself, so memory
+        use does not depend on how long the output runs.
+        """
+        samples = max(voltages.shape)
+
+        loopTask = self.backend.Task(self._taskName("loop"))
+        try:
+            self._addOutputChannels(loopTask, channels)
+            self._configureChannelTimings(loopTask, samples, continuous=True)
+            loopTask.out_stream.regen_mode = self.backend.ALLOW_REGENERATION
+
+            writer = self.backend.writer(loopTask)
+            writer.write_many_sample(MyDAQ._writeBuffer(voltages))
+            loopTask.start()
+        except BaseException:
+            loopTask.close()
+            raise
+
+        return OutputHandle(loopTask)
+
+    def writeStream(
+        self,
+        chunks: Iterable[np.ndarray],
+        *channels: str,
+        bufferSize: int = None,
+        timeout: float = 10,
+    ) -> int:
+        """
+        Write consecutive `chunks` of voltages (e.g. from a generator) to
+        user-specified channels as one continuous output, returning the
+        number of samples written per channel once all have been generated.
+        Only `bufferSize` samples per channel are held by the device (four
+        chunks by default), so memory use does not depend on the duration.
+        """
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            return 0
+
+        chunks = chain([first], chunks)
+        bufferSize = bufferSize or 4 * max(first.shape)
+
+        with self.backend.Task(self._taskName("streamWrite")) as streamTask:
+            self._addOutputChannels(streamTask, channels)
+            self._configureChannelTimings(streamTask, bufferSize, continuous=True)
+            streamTask.out_stream.regen_mode = self.backend.DONT_ALLOW_REGENERATION
+
+            writer = self.backend.writer(streamTask)
+            written = 0
+            started = False
+            for chunk in chunks:
+                chunk = MyDAQ._writeBuffer(chunk)
+
+                # Fill the buffer before starting, so the device does not
+                # run out of samples while waiting for the next chunk
+                if not started and written + chunk.shape[-1] > bufferSize:
+                    streamTask.start()
+                    started = True
+
+                writer.write_many_sample(chunk, timeout=timeout)
+                written += chunk.shape[-1]
+
+            if not started:
+                streamTask.start()
+
+            # Wait for the device to generate everything written, allowing
+            # `timeout` on top of the time the remaining samples take
+            remaining = written - streamTask.out_stream.total_samp_per_chan_generated
+            deadline = perf_counter() + timeout + remaining / self.samplerate
+            while streamTask.out_stream.total_samp_per_chan_generated < written:
+                if perf_counter() > deadline:
+                    raise TimeoutError(
+                        f"Task {streamTask.name} did not finish within {timeout} s."
+                    )
+                sleep(min(bufferSize / self.samplerate / 10, 0.01))
+            streamTask.stop()
+
+        return written
 
     def readwrite(
         self,
@@ -129,24 +814,42 @@ class MyDAQ:
         readChannels: str | list[str],
         writeChannels: str | list[str],
         timeout: float = 300,
+        out: np.ndarray = None,
     ) -> np.ndarray:
+        """
+        Write `voltages` to `writeChannels` while reading from `readChannels`.
+        The samples are read directly into `out` if provided.
+        """
         samples = max(voltages.shape)
 
-        with dx.Task("read") as readTask, dx.Task("write") as writeTask:
-            self._addOutputChannels(writeTask, writeChannels)
-            self._addInputChannels(readTask, readChannels)
-
-            self._configureChannelTimings(writeTask, samples)
-            self._configureChannelTimings(readTask, samples)
+        if isinstance(readChannels, str):
+            readChannels = [readChannels]
+        data = MyDAQ._readBuffer(len(readChannels), samples, out)
 
+        start = perf_counter()
+        with (
+            self._task("read", readChannels, samples) as readTask,
+            self._task("write", writeChannels, samples, output=True) as writeTask,
+        ):
             # Start writing. Since reading is a blocking function, there
             # is no need to sleep and wait for writing to finish.
-            writeTask.write(voltages)
+            acquisition = perf_counter()
+            writer = self.backend.writer(writeTask)
+            buffer = MyDAQ._writeBuffer(voltages)
+            with instrumentation.stage("readwrite.write", buffer.size, buffer.nbytes):
+                writer.write_many_sample(buffer)
 
             writeTask.start()
-            data = readTask.read(number_of_samples_per_channel=samples, timeout=timeout)
+            reader = self.backend.reader(readTask)
+            with instrumentation.stage("readwrite.transfer", data.size, data.nbytes):
+                reader.read_many_sample(
+                    data, number_of_samples_per_channel=samples, timeout=timeout
+                )
+            acquisition = perf_counter() - acquisition
+
+        self._recordTiming("readwrite", start, acquisition)
 
-            return np.asarray(data)
+        return data[0] if len(readChannels) == 1 else data
 
     @staticmethod
     def generateWaveform(
@@ -157,6 +860,9 @@ class MyDAQ:
         phase: float = 0,
         duration: float = 1,
         phaseInDegrees: bool = True,
+        dtype=np.float64,
+        out: np.ndarray = None,
+        cache: bool = False,
     ) -> np.ndarray:
         """
         Geneate a waveform from the 4 basic wave parameters
@@ -178,6 +884,15 @@ class MyDAQ:
             Duration of the waveform in seconds. The default is 1.
         phaseInDegrees: bool, optional
             Whether phase is given in degrees. The default is True
+        dtype : dtype, optional
+            Data type of the waveform. The default is float64.
+        out : ndarray, optional
+            Array to write the waveform into, instead of a new array.
+        cache : bool, optional
+            Whether to look up (and store) the waveform and time array in
+            `waveformCache`, e.g. for stimuli that are generated repeatedly.
+            Cached arrays are read-only, so this is ignored if `out` is
+            given. The default is False.
 
         Returns
         -------
@@ -187,37 +902,175 @@ class MyDAQ:
             ndarray of the evaluated waveform.
 
         """
-        timeArray = MyDAQ.getTimeArray(duration, samplerate)
+        cache = cache and out is None
+        timeArray = MyDAQ.getTimeArray(duration, samplerate, cache=cache)
         if phaseInDegrees:
             phase = np.deg2rad(phase)
 
+        key = (function, samplerate, frequency, amplitude, phase, duration)
+        key += (np.dtype(dtype),)
+        if cache:
+            wave = MyDAQ.waveformCache.get(key)
+            if wave is not None:
+                return timeArray, wave
+
+        if out is None:
+            out = np.empty(timeArray.size, dtype=dtype)
+        assert out.shape == timeArray.shape, f"out should have shape {timeArray.shape}."
+
+        # Basic waveforms repeat exactly if an integer number of periods fits
+        # an integer number of samples. Then only one period is evaluated.
+        period = None
         if not callable(function):
+            period = MyDAQ.getPeriodSamples(samplerate, frequency, duration)
             function = MyDAQ.findFunction(function)
 
-        wave = function(timeArray, amplitude, frequency, phase)
+        if period is None:
+            out[:] = function(timeArray, amplitude, frequency, phase)
+        else:
+            wave = function(timeArray[:period], amplitude, frequency, phase)
+            repeats = out.size // period
+            out[: repeats * period].reshape(repeats, period)[:] = wave
+            out[repeats * period :] = wave[: out.size - repeats * period]
 
-        return timeArray, wave
+        if cache:
+            out = MyDAQ.waveformCache.put(key, out)
+
+        return timeArray, out
 
     @staticmethod
     def findFunction(function: str):
-        match function:
-            case "sine":
-                return lambda x, A, f, p: A * np.sin(2 * np.pi * f * x + p)
-            case "square":
-                return lambda x, A, f, p: A * square(2 * np.pi * f * x + p)
-            case "sawtooth":
-                return lambda x, A, f, p: A * sawtooth(2 * np.pi * f * x + p)
-            case "isawtooth":
-                return lambda x, A, f, p: A * sawtooth(2 * np.pi * f * x + p, width=0)
-            case "triangle":
-                return lambda x, A, f, p: A * sawtooth(2 * np.pi * f * x + p, width=0.5)
-            case _:
-                raise ValueError(f"{function} is not a recognized wavefront form")
+        if function not in WAVEFORMS:
+            raise ValueError(f"{function} is not a recognized wavefront form")
+
+        return WAVEFORMS[function]
+
+    @staticmethod
+    def getPeriodSamples(samplerate: int, frequency: float, duration: float) -> int | None:
+        """
+        Number of samples after which a waveform of `frequency`, sampled on
+        `getTimeArray`, exactly repeats. None if it does not repeat within
+        half of the samples, or if the time array is not evenly spaced at
+        the samplerate.
+        """
+        samples = MyDAQ.convertDurationToSamples(samplerate, duration)
+        if samples < 2 or abs(duration * samplerate - samples) > 1e-9 * samples:
+            return None
+
+        # A frequency of p / q periods per sample repeats every q samples
+        ratio = frequency / samplerate
+        fraction = Fraction(ratio).limit_denominator(samples // 2)
+        if fraction == 0 or abs(fraction - ratio) * samples > 1e-9:
+            return None
+
+        return fraction.denominator
+
+    @staticmethod
+    def generateMultisine(
+        samplerate: int,
+        frequencies: np.ndarray,
+        amplitude: float = 1,
+        duration: float = 1,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generate a Schroeder-phased multisine, exciting all `frequencies`
+        at once with a low crest factor
+
+        Parameters
+        ----------
+        samplerate: int
+            Samplerate with which to sample waveform.
+        frequencies : ndarray
+            Frequencies to excite. These are moved to the nearest Fourier
+            frequency of the waveform, such that each tone contains an
+            integer number of periods and does not leak into other bins.
+        amplitude : int or float, optional
+            Peak amplitude of the waveform in volts. The default is 1.
+        duration : int or float, optional
+            Duration of the waveform in seconds. The default is 1.
+
+        Returns
+        -------
+        timeArray : ndarray
+            ndarray containing the discrete times at which the waveform is evaluated.
+        wave : ndarray
+            ndarray of the evaluated waveform.
+        frequencies : ndarray
+            The (unique) excited frequencies.
+
+        """
+        timeArray = MyDAQ.getTimeArray(duration, samplerate)
+
+        # Move frequencies onto the Fourier frequencies of the waveform
+        binWidth = samplerate / timeArray.size
+        bins = np.unique(np.round(np.asarray(frequencies) / binWidth).astype(int))
+        bins = bins[(bins > 0) & (bins < timeArray.size / 2)]
+        frequencies = bins * binWidth
+
+        # Schroeder phases keep the tones from adding up to large peaks
+        k = np.arange(1, frequencies.size + 1)
+        phases = -np.pi * k * (k - 1) / frequencies.size
+
+        wave = np.zeros_like(timeArray)
+        for frequency, phase in zip(frequencies, phases):
+            wave += np.sin(2 * np.pi * frequency * timeArray + phase)
+
+        wave *= amplitude / np.abs(wave).max()
+
+        return timeArray, wave, frequencies
+
+    @staticmethod
+    def generateChirp(
+        samplerate: int,
+        startFrequency: float,
+        stopFrequency: float,
+        amplitude: float = 1,
+        duration: float = 1,
+        method: str = "logarithmic",
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generate a chirp sweeping from `startFrequency` to `stopFrequency`
+        over `duration` seconds, logarithmically by default. See
+        `scipy.signal.chirp` for the other methods.
+
+        Returns
+        -------
+        timeArray : ndarray
+            ndarray containing the discrete times at which the waveform is evaluated.
+        wave : ndarray
+            ndarray of the evaluated waveform.
+
+        """
+        from scipy.signal import chirp
+
+        timeArray = MyDAQ.getTimeArray(duration, samplerate)
+        wave = amplitude * chirp(
+            timeArray - timeArray[0],
+            startFrequency,
+            timeArray[-1] - timeArray[0],
+            stopFrequency,
+            method=method,
+        )
+
+        return timeArray, wave
 
     @staticmethod
-    def getTimeArray(duration: float, samplerate: int) -> np.ndarray:
-        steps = MyDAQ.convertDurationToSamples(samplerate, duration)
-        return np.linspace(1 / samplerate, duration, steps)
+    def getTimeArray(
+        duration: float, samplerate: int, cache: bool = False
+    ) -> np.ndarray:
+        """
+        Times at which a waveform of `duration` is sampled, read-only and
+        shared through `waveformCache` if `cache` is set
+        """
+        key = ("timeArray", duration, samplerate)
+        timeArray = MyDAQ.waveformCache.get(key) if cache else None
+        if timeArray is None:
+            steps = MyDAQ.convertDurationToSamples(samplerate, duration)
+            timeArray = np.linspace(1 / samplerate, duration, steps)
+            if cache:
+                timeArray = MyDAQ.waveformCache.put(key, timeArray)
+
+        return timeArray
 
     def __str__(self) -> str:
         """
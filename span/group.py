@@ -0,0 +1,144 @@
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from time import time
+import numpy as np
+from span.daq import MyDAQ
+from span.sweep import SweepPlan, runSweep
+
+
+@dataclass
+class DeviceResult:
+    """
+    Result of a call on one device of a `DAQGroup`. `start` and `stop` are
+    the wall-clock times (as `time.time`) at which the call started and
+    returned on that device, so results of several devices can be merged.
+    """
+
+    device: str
+    start: float
+    stop: float
+    value: object
+
+
+class DAQGroup:
+    """
+    Several MyDAQ's acting in parallel. Every device gets its own worker
+    thread, so calls on different devices run concurrently, while calls on
+    the same device run one after the other in the order they were made.
+    Every finished call is also appended to `results`, shared by all
+    devices. Use as
+
+        with DAQGroup([daq1, daq2]) as group:
+            data = group.read(1, "AI0", "AI1")
+
+    where `data` maps the name of each device to its `DeviceResult`.
+    """
+
+    def __init__(self, daqs: Iterable[MyDAQ]):
+        self.daqs = {}
+        for daq in daqs:
+            assert not (daq.name is None), "Name should be set first."
+            assert daq.name not in self.daqs, f"Device {daq.name} is added twice."
+            self.daqs[daq.name] = daq
+
+        self.results = []
+        self.__lock = Lock()
+        self.__workers = {
+            name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+            for name in self.daqs
+        }
+
+    def submit(self, device: str, function: Callable, *args, **kwargs) -> Future:
+        """
+        Call `function(daq, *args, **kwargs)` on the worker of `device`,
+        returning a future of its `DeviceResult`
+        """
+        if device not in self.daqs:
+            raise ValueError(f"{device} is not a device of the group")
+
+        def call() -> DeviceResult:
+            start = time()
+            value = function(self.daqs[device], *args, **kwargs)
+            result = DeviceResult(device, start, time(), value)
+
+            with self.__lock:
+                self.results.append(result)
+
+            return result
+
+        return self.__workers[device].submit(call)
+
+    def map(self, function: Callable, *args, **kwargs) -> dict[str, DeviceResult]:
+        """
+        Call `function(daq, *args, **kwargs)` on all devices at once, and
+        wait for all of them to finish
+        """
+        futures = {
+            device: self.submit(device, function, *args, **kwargs)
+            for device in self.daqs
+        }
+        wait(futures.values())
+
+        return {device: future.result() for device, future in futures.items()}
+
+    def read(
+        self, duration: float, *channels: str, timeout: float = 300
+    ) -> dict[str, DeviceResult]:
+        """
+        `MyDAQ.read` on all devices at once
+        """
+        return self.map(MyDAQ.read, duration, *channels, timeout=timeout)
+
+    def readwrite(
+        self,
+        voltages: np.ndarray,
+        readChannels: str | list[str],
+        writeChannels: str | list[str],
+        timeout: float = 300,
+    ) -> dict[str, DeviceResult]:
+        """
+        `MyDAQ.readwrite` on all devices at once
+        """
+        return self.map(
+            MyDAQ.readwrite, voltages, readChannels, writeChannels, timeout=timeout
+        )
+
+    def sweep(
+        self, plan: SweepPlan, readChannels: list[str], writeChannel: str, **kwargs
+    ) -> dict[str, DeviceResult]:
+        """
+        `span.sweep.runSweep` of `plan` on all devices at once, each
+        measuring its own device under test. Every sweep keeps its own
+        session, so do not call this within `session`.
+        """
+        return self.map(runSweep, plan, readChannels, writeChannel, **kwargs)
+
+    @staticmethod
+    def merge(results: Iterable[DeviceResult]) -> list[DeviceResult]:
+        """
+        Results of several devices (e.g. `results`) in the order they started
+        """
+        return sorted(results, key=lambda result: result.start)
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """
+        Keep the tasks of every device alive between calls, see `MyDAQ.session`
+        """
+        with ExitStack() as stack:
+            for daq in self.daqs.values():
+                stack.enter_context(daq.session())
+            yield
+
+    def close(self) -> None:
+        for worker in self.__workers.values():
+            worker.shutdown()
+
+    def __enter__(self) -> "DAQGroup":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
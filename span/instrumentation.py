@@ -0,0 +1,188 @@
+from contextlib import nullcontext
+import json
+from threading import Lock
+from time import perf_counter_ns
+import numpy as np
+
+# Returned by `Instrumentation.stage` while disabled. Reusable, as it has no state
+_DISABLED = nullcontext()
+
+
+class _Stage:
+    """
+    Context manager timing a single pass through a stage
+    """
+
+    __slots__ = ("instrumentation", "name", "samples", "nbytes", "start")
+
+    def __init__(self, instrumentation, name: str, samples: int, nbytes: int):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.samples = samples
+        self.nbytes = nbytes
+
+    def __enter__(self) -> "_Stage":
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *args) -> None:
+        duration = (perf_counter_ns() - self.start) * 1e-9
+        self.instrumentation.record(self.name, duration, self.samples, self.nbytes)
+
+
+class Instrumentation:
+    """
+    Collects the duration, number of samples and bytes moved of every pass
+    through the named stages of acquisition and analysis, e.g.
+
+        instrumentation.enable()
+        ...
+        print(instrumentation.summary())
+        instrumentation.export("timings.json")
+
+    Disabled by default, in which case `stage` returns a shared no-op
+    context manager and nothing is recorded. Stages may be recorded from
+    several threads at once, e.g. by a `DAQGroup` or `pipelineSweep`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.__lock = Lock()
+        self.clear()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__durations = {}
+            self.__samples = {}
+            self.__nbytes = {}
+
+    def stage(self, name: str, samples: int = 0, nbytes: int = 0):
+        """
+        Context manager timing the enclosed code as a pass through `name`,
+        which handled `samples` samples and moved `nbytes` bytes
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name, samples, nbytes)
+
+    def record(
+        self, name: str, duration: float, samples: int = 0, nbytes: int = 0
+    ) -> None:
+        """
+        Record a pass through `name` that took `duration` seconds
+        """
+        if not self.enabled:
+            return
+
+        with self.__lock:
+            self.__durations.setdefault(name, []).append(duration)
+            self.__samples[name] = self.__samples.get(name, 0) + samples
+            self.__nbytes[name] = self.__nbytes.get(name, 0) + nbytes
+
+    @property
+    def stages(self) -> list[str]:
+        with self.__lock:
+            return list(self.__durations)
+
+    def getDurations(self, name: str) -> np.ndarray:
+        with self.__lock:
+            if name not in self.__durations:
+                raise ValueError(f"{name} is not a recorded stage")
+
+            return np.array(self.__durations[name])
+
+    def histogram(self, name: str, bins: int = 20) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Histogram of the durations of `name`, in logarithmically spaced bins
+        between the shortest and longest duration
+
+        Returns
+        -------
+        counts : ndarray
+            Number of passes in each bin.
+        edges : ndarray
+            Edges of the bins in seconds.
+
+        """
+        durations = self.getDurations(name)
+        lowest = max(durations.min(), 1e-9)
+        highest = max(durations.max(), lowest * 1.01)
+        edges = np.geomspace(lowest, highest, bins + 1)
+
+        return np.histogram(np.clip(durations, lowest, highest), bins=edges)
+
+    def getStatistics(self, name: str) -> dict:
+        """
+        Count, total and percentiles of the durations of `name` in seconds,
+        with the total number of samples and bytes and their rates
+        """
+        durations = self.getDurations(name)
+        total = durations.sum()
+        p50, p95 = np.percentile(durations, [50, 95])
+
+        return {
+            "count": durations.size,
+            "total": total,
+            "mean": total / durations.size,
+            "p50": p50,
+            "p95": p95,
+            "max": durations.max(),
+            "samples": self.__samples[name],
+            "bytes": self.__nbytes[name],
+            "samplesPerSecond": self.__samples[name] / total if total else 0,
+            "bytesPerSecond": self.__nbytes[name] / total if total else 0,
+        }
+
+    def summary(self) -> str:
+        """
+        Table of the statistics of every stage, longest total first
+        """
+        title = "Instrumentation"
+        header = (
+            f"{'stage':<20} {'count':>7} {'total [ms]':>11} {'mean [us]':>10} "
+            f"{'p95 [us]':>10} {'max [us]':>10} {'[S/s]':>10} {'[MB/s]':>8}"
+        )
+        lines = [title, "=" * len(title), header]
+
+        statistics = {name: self.getStatistics(name) for name in self.stages}
+        for name in sorted(statistics, key=lambda name: -statistics[name]["total"]):
+            stats = statistics[name]
+            lines.append(
+                f"{name:<20} {stats['count']:>7} {stats['total'] * 1e3:>11.2f} "
+                f"{stats['mean'] * 1e6:>10.1f} {stats['p95'] * 1e6:>10.1f} "
+                f"{stats['max'] * 1e6:>10.1f} {stats['samplesPerSecond']:>10.3g} "
+                f"{stats['bytesPerSecond'] / 1e6:>8.1f}"
+            )
+
+        return "\n".join(lines)
+
+    def toDict(self, bins: int = 20) -> dict:
+        """
+        Statistics and histogram of every stage, as saved by `export`
+        """
+        report = {}
+        for name in self.stages:
+            counts, edges = self.histogram(name, bins)
+            report[name] = {
+                **self.getStatistics(name),
+                "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+            }
+
+        return report
+
+    def export(self, path: str, bins: int = 20) -> None:
+        """
+        Save the statistics and histogram of every stage to `path` as JSON
+        """
+        with open(path, "w") as file:
+            json.dump(self.toDict(bins), file, indent=2, default=float)
+
+
+# Instrumentation of the acquisition and analysis in `span`
+instrumentation = Instrumentation()
@@ -0,0 +1,282 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.gridspec import GridSpec
+
+# Saves figures in the background, see `saveBode`
+_saver = None
+
+
+def decimateMinMax(y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Indices of at most about `points` samples of `y` that preserve its
+    envelope: the minimum and maximum of each of `points / 2` equally
+    sized buckets, in order. Plotting `x[indices], y[indices]` looks the
+    same as plotting all of a multi-million sample capture, at a fraction
+    of the cost. Works on memory maps (e.g. `Recording.data`) too.
+    """
+    y = np.asarray(y)
+    if y.size <= points:
+        return np.arange(y.size)
+
+    buckets = max(points // 2, 1)
+    size = y.size // buckets
+    offsets = np.arange(buckets) * size
+
+    trimmed = y[: buckets * size].reshape(buckets, size)
+    indices = [trimmed.argmin(axis=1) + offsets, trimmed.argmax(axis=1) + offsets]
+
+    # Samples that did not fill a whole bucket
+    if buckets * size < y.size:
+        tail = y[buckets * size :]
+        indices.append([buckets * size + tail.argmin(), buckets * size + tail.argmax()])
+
+    return np.unique(np.concatenate(indices))
+
+
+def createBodeAxes(fig: Figure) -> tuple:
+    """
+    Magnitude, phase and polar axes of a Bode plot, as used by `plotBode`
+    """
+    # Use GridSpec to nicely center subplots
+    gs = GridSpec(2, 4, figure=fig)
+
+    magAx = fig.add_subplot(gs[0, :2])
+    phaseAx = fig.add_subplot(gs[0, 2:])
+    polarAx = fig.add_subplot(gs[1, 1:3], projection="polar")
+
+    # Add labels
+    magAx.set_xlabel("Frequency [rad s$^{-1}$]")
+    magAx.set_ylabel(r"log$_{10}$|H($\omega$)|")
+    phaseAx.set_xlabel("Frequency [rad s$^{-1}$]")
+    phaseAx.set_ylabel(r"Arg(H($\omega$)")
+    polarAx.set_xlabel(r"$\phi$")
+    polarAx.set_ylabel(r"$\omega$")
+
+    # Convert to logarithmic axes
+    magAx.set_xscale("log")
+    phaseAx.set_xscale("log")
+
+    # Add grid
+    magAx.grid(alpha=0.5)
+    phaseAx.grid(alpha=0.5)
+    polarAx.grid(alpha=0.5)
+
+    return magAx, phaseAx, polarAx
+
+
+def drawBode(
+    fig: Figure,
+    freqs: np.ndarray,
+    mag: np.ndarray,
+    phase: np.ndarray,
+    analytic: np.ndarray = None,
+    points: int = None,
+) -> tuple:
+    """
+    Draw a Bode plot on `fig`, decimating the measured points to about
+    `points` points (see `decimateMinMax`) if provided
+    """
+    freqs, mag, phase = np.asarray(freqs), np.asarray(mag), np.asarray(phase)
+    magAx, phaseAx, polarAx = createBodeAxes(fig)
+
+    # Plot data
+    measured = np.arange(freqs.size)
+    if points is not None:
+        measured = decimateMinMax(mag, points)
+
+    magAx.scatter(
+        freqs[measured], 20 * np.log10(abs(mag[measured])), s=4, c="k", label="Measured"
+    )
+    phaseAx.scatter(freqs[measured], phase[measured], s=4, c="k")
+    polarAx.scatter(phase[measured], mag[measured], s=4, c="k")
+
+    # Add analytic if provided
+    if not (analytic is None):
+        magAx.plot(freqs, 20 * np.log10(abs(analytic)), c="r", label="Analytic")
+        phaseAx.plot(freqs, np.angle(analytic), c="r")
+        polarAx.plot(np.angle(analytic), abs(analytic), c="r")
+
+        magAx.legend()
+
+    fig.tight_layout()
+
+    return magAx, phaseAx, polarAx
+
+
+def saveBode(
+    path: str,
+    freqs: np.ndarray,
+    mag: np.ndarray,
+    phase: np.ndarray,
+    analytic: np.ndarray = None,
+    points: int = None,
+    dpi: int = 150,
+) -> Future:
+    """
+    Save a Bode plot to `path` in the background, without pyplot or a GUI,
+    e.g. for batch runs on headless machines. Returns a future that
+    completes once the file is written. Figures are saved one at a time.
+    """
+    global _saver
+    if _saver is None:
+        _saver = ThreadPoolExecutor(max_workers=1)
+
+    # Copy, so the caller may reuse its arrays while saving
+    arrays = [np.array(array) for array in (freqs, mag, phase)]
+    analytic = None if analytic is None else np.array(analytic)
+
+    def save() -> None:
+        fig = Figure(figsize=(10, 7))
+        drawBode(fig, *arrays, analytic=analytic, points=points)
+        fig.savefig(path, dpi=dpi)
+
+    return _saver.submit(save)
+
+
+def plotCapture(
+    samplerate: int,
+    voltages: np.ndarray,
+    points: int = 4000,
+    labels: list[str] = None,
+    ax=None,
+):
+    """
+    Plot the voltages of a (multi-channel) capture against time, decimated
+    to about `points` points per channel with `decimateMinMax`
+    """
+    from matplotlib import pyplot as plt
+
+    voltages = np.atleast_2d(voltages)
+    ax = plt.gca() if ax is None else ax
+    labels = labels or [None] * voltages.shape[0]
+
+    for voltage, label in zip(voltages, labels):
+        indices = decimateMinMax(voltage, points)
+        ax.plot((indices + 1) / samplerate, voltage[indices], label=label)
+
+    ax.set_xlabel("Time [s]")
+    ax.set_ylabel("Amplitude [V]")
+    if labels[0] is not None:
+        ax.legend()
+
+    return ax
+
+
+class LiveBodePlot:
+    """
+    Bode plot of a sweep that is updated as each point arrives, e.g.
+
+        live = LiveBodePlot(plan.freqs)
+        pipelineSweep(daq, plan, ["AI0", "AI1"], "AO0", onPoint=live.update)
+
+    The axes, grid and analytic curve are drawn once and kept as a
+    background. On every update only the measured points are redrawn on
+    top of it (blitting). The whole figure is only redrawn when a point
+    falls outside the magnitude limits, or the window is resized.
+    """
+
+    def __init__(
+        self,
+        freqs: np.ndarray,
+        analytic: np.ndarray = None,
+        magLimits: tuple[float, float] = (-60, 10),
+    ):
+        from matplotlib import pyplot as plt
+
+        self.freqs = np.asarray(freqs, dtype=float)
+        self.magnitude = np.full(self.freqs.size, np.nan)
+        self.phase = np.full(self.freqs.size, np.nan)
+
+        self.figure = plt.figure(figsize=(10, 7))
+        self.axes = createBodeAxes(self.figure)
+        magAx, phaseAx, polarAx = self.axes
+
+        # Fix the limits, so they do not change with every point
+        limits = (self.freqs.min() / 1.2, self.freqs.max() * 1.2)
+        magAx.set_xlim(*limits)
+        magAx.set_ylim(*magLimits)
+        phaseAx.set_xlim(*limits)
+        phaseAx.set_ylim(-np.pi, np.pi)
+        polarAx.set_rmax(10 ** (magLimits[1] / 20))
+
+        if not (analytic is None):
+            magAx.plot(self.freqs, 20 * np.log10(abs(analytic)), c="r")
+            phaseAx.plot(self.freqs, np.angle(analytic), c="r")
+            polarAx.plot(np.angle(analytic), abs(analytic), c="r")
+
+        # Animated artists are left out of full redraws, and blitted instead
+        self.__artists = [
+            ax.plot([], [], ls="none", marker="o", ms=2, c="k", animated=True)[0]
+            for ax in self.axes
+        ]
+        self.__backgrounds = None
+
+        canvas = self.figure.canvas
+        canvas.mpl_connect("draw_event", self._onDraw)
+        self.figure.tight_layout()
+        plt.show(block=False)
+        canvas.draw()
+
+    def _onDraw(self, event) -> None:
+        """
+        Keep the freshly drawn figure as background, and draw the points on it
+        """
+        canvas = self.figure.canvas
+        if canvas.supports_blit:
+            self.__backgrounds = [canvas.copy_from_bbox(ax.bbox) for ax in self.axes]
+        for ax, artist in zip(self.axes, self.__artists):
+            ax.draw_artist(artist)
+
+    def update(self, index: int, magnitude: float, phase: float) -> None:
+        """
+        Add the measured magnitude and phase of `freqs[index]`
+        """
+        self.magnitude[index] = magnitude
+        self.phase[index] = phase
+
+        measured = ~np.isnan(self.magnitude)
+        magAx, phaseAx, polarAx = self.axes
+        magnitudeArtist, phaseArtist, polarArtist = self.__artists
+        magnitudeArtist.set_data(
+            self.freqs[measured], 20 * np.log10(abs(self.magnitude[measured]))
+        )
+        phaseArtist.set_data(self.freqs[measured], self.phase[measured])
+        polarArtist.set_data(self.phase[measured], self.magnitude[measured])
+
+        # Widen the limits (and redraw everything) if the point does not fit
+        dB = 20 * np.log10(abs(magnitude))
+        low, high = magAx.get_ylim()
+        canvas = self.figure.canvas
+        outside = np.isfinite(dB) and not low <= dB <= high
+        if outside or self.__backgrounds is None:
+            if outside:
+                magAx.set_ylim(min(low, dB - 5), max(high, dB + 5))
+                polarAx.set_rmax(max(polarAx.get_rmax(), abs(magnitude) * 1.1))
+            canvas.draw()
+        else:
+            for ax, artist, background in zip(
+                self.axes, self.__artists, self.__backgrounds
+            ):
+                canvas.restore_region(background)
+                ax.draw_artist(artist)
+                canvas.blit(ax.bbox)
+
+        canvas.flush_events()
+
+    def save(self, path: str, dpi: int = 150) -> None:
+        """
+        Save the plot with all points measured so far to `path`
+        """
+        for artist in self.__artists:
+            artist.set_animated(False)
+        self.figure.savefig(path, dpi=dpi)
+        for artist in self.__artists:
+            artist.set_animated(True)
+
+        self.figure.canvas.draw()
+
+    def close(self) -> None:
+        from matplotlib import pyplot as plt
+
+        plt.close(self.figure)
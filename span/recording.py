@@ -0,0 +1,207 @@
+from datetime import datetime, timezone
+import json
+import os
+from time import time
+import numpy as np
+
+# Size in bytes of the (padded) JSON header at the start of a recording
+HEADER_SIZE = 4096
+FORMAT = "span-recording"
+VERSION = 1
+
+# Dtype of the chunk index: first sample of each chunk, and its wall-clock time
+INDEX_DTYPE = np.dtype([("sample", "<i8"), ("time", "<f8")])
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _indexPath(path: str) -> str:
+    return f"{path}.idx"
+
+
+class RecordingWriter:
+    """
+    Append-only sink for long (multi-channel) acquisitions. Chunks of shape
+    (channels, samples) are written to disk as they arrive, so memory use
+    does not depend on the length of the recording. Use as
+
+        with RecordingWriter(path, samplerate, channels) as writer:
+            for chunk in daq.stream(chunkSize, *channels):
+                writer.write(chunk)
+
+    The file starts with a JSON header of `HEADER_SIZE` bytes, describing
+    the samplerate, channels, device, start and stop time and dtype,
+    followed by the samples interleaved per channel. With `index` set, the
+    first sample and wall-clock time of every chunk are kept in a `.idx`
+    sidecar file. Reopen the recording with `Recording`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        samplerate: int,
+        channels: list[str],
+        device: str = "",
+        dtype: np.dtype = np.float64,
+        index: bool = True,
+    ):
+        self.path = path
+        self.samples = 0
+        self.header = {
+            "format": FORMAT,
+            "version": VERSION,
+            "samplerate": samplerate,
+            "channels": list(channels),
+            "device": device,
+            "dtype": np.dtype(dtype).str,
+            "start": _now(),
+            "stop": None,
+            "samples": 0,
+        }
+
+        self.__file = open(path, "wb")
+        self.__index = open(_indexPath(path), "wb") if index else None
+        self.__scratch = np.empty((0, len(channels)), dtype=dtype)
+        self._writeHeader()
+
+    def _writeHeader(self) -> None:
+        header = json.dumps(self.header).encode()
+        assert len(header) < HEADER_SIZE, "Header does not fit, use fewer channels."
+
+        position = self.__file.tell()
+        self.__file.seek(0)
+        self.__file.write(header.ljust(HEADER_SIZE - 1) + b"\n")
+        self.__file.seek(max(position, HEADER_SIZE))
+
+    def write(self, chunk: np.ndarray) -> None:
+        """
+        Append the next chunk of samples, of shape (channels, samples)
+        """
+        chunk = np.atleast_2d(chunk)
+        channels, samples = chunk.shape
+        assert channels == self.__scratch.shape[1], (
+            f"Expected {self.__scratch.shape[1]} channels, got {channels}."
+        )
+
+        if self.__index is not None:
+            self.__index.write(np.array((self.samples, time()), dtype=INDEX_DTYPE))
+
+        # Interleave into a reused buffer, which is written without copying
+        if self.__scratch.shape[0] < samples:
+            self.__scratch = np.empty((samples, channels), dtype=self.__scratch.dtype)
+        interleaved = self.__scratch[:samples]
+        np.copyto(interleaved, chunk.T, casting="same_kind")
+
+        self.__file.write(interleaved)
+        self.samples += samples
+
+    def close(self) -> None:
+        if self.__file.closed:
+            return
+
+        self.header["stop"] = _now()
+        self.header["samples"] = self.samples
+        self._writeHeader()
+        self.__file.close()
+
+        if self.__index is not None:
+            self.__index.close()
+
+    def __enter__(self) -> "RecordingWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class Recording:
+    """
+    Recording made by `RecordingWriter`, opened as a read-only memory map.
+    `data` has shape (channels, samples) like `MyDAQ.read`, but samples are
+    only loaded from disk once accessed, so slices of recordings larger
+    than memory can be passed to `Bode` or plotted directly.
+
+    The number of samples follows from the size of the file, so recordings
+    that were not closed properly (e.g. after a crash) can still be opened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as file:
+            self.header = json.loads(file.read(HEADER_SIZE))
+        assert self.header.get("format") == FORMAT, f"{path} is not a recording."
+
+        dtype = np.dtype(self.header["dtype"])
+        channels = len(self.channels)
+        samples = (os.path.getsize(path) - HEADER_SIZE) // (dtype.itemsize * channels)
+
+        if samples > 0:
+            interleaved = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=HEADER_SIZE,
+                shape=(samples, channels),
+            )
+        else:
+            interleaved = np.empty((0, channels), dtype=dtype)
+        self.data = interleaved.T
+
+        self.index = None
+        if os.path.exists(_indexPath(path)):
+            self.index = np.fromfile(_indexPath(path), dtype=INDEX_DTYPE)
+
+    @property
+    def samplerate(self) -> int:
+        return self.header["samplerate"]
+
+    @property
+    def channels(self) -> list[str]:
+        return self.header["channels"]
+
+    @property
+    def device(self) -> str:
+        return self.header["device"]
+
+    @property
+    def samples(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.samplerate
+
+    def getChannel(self, channel: str) -> np.ndarray:
+        """
+        Samples of a single channel, by name
+        """
+        if channel not in self.channels:
+            raise ValueError(f"{channel} is not a recorded channel")
+
+        return self.data[self.channels.index(channel)]
+
+    def getSlice(self, start: float = 0, duration: float = None) -> np.ndarray:
+        """
+        Samples of all channels from `start` seconds onwards, for `duration`
+        seconds (or until the end of the recording if not provided)
+        """
+        first = int(start * self.samplerate)
+        last = None if duration is None else first + int(duration * self.samplerate)
+
+        return self.data[:, first:last]
+
+    def __str__(self) -> str:
+        title = f"Recording {self.path}"
+
+        return (
+            title
+            + f"\n{'=' * len(title)}"
+            + f"\nDevice: {self.device}"
+            + f"\nChannels: {', '.join(self.channels)}"
+            + f"\nSamplerate: {self.samplerate}"
+            + f"\nDuration: {self.duration:.2f} s"
+            + f"\nStarted: {self.header['start']}"
+        )
@@ -0,0 +1,456 @@
+from threading import Lock
+import numpy as np
+from time import perf_counter, sleep
+
+
+class SimulatedBackend:
+    """
+    In-process stand-in for nidaqmx, to be passed to `MyDAQ` so that it can
+    be used without the hardware. Input channels read the sum of
+
+    * `source(t)`, where `t` are the sample times since the read task was
+      started. `source` may return one array for all channels, or one row
+      per channel.
+    * The output channels routed to them by `routes`, which maps input
+      channels to either an output channel (a plain wire), or a tuple of
+      an output channel and a `scipy.signal` LTI system it passes through,
+      e.g. {"AI0": ("AO0", TransferFunction([1], [1e-3, 1])), "AI1": "AO0"}.
+      Continuous systems are discretised at the samplerate, and simulated
+      with `lfilter`, carrying the filter state from one read to the next.
+      Routed outputs arrive `latency` seconds late.
+    * Noise, either Gaussian with standard deviation `noise`, or the
+      result of calling `noise(rng, shape)`.
+
+    Channels are matched without their device name, and case-insensitive.
+    Outputs are zero before their task starts, and hold their last value
+    once all samples have been generated (unless they are regenerated).
+
+    If `realtime` is set, reads and `wait_until_done` block until the
+    samples would have been acquired (or generated) by a physical device.
+
+    Like DAQmx, named tasks must have unique names while they are open,
+    across all (simulated) devices of the process.
+    """
+
+    FINITE = "finite"
+    CONTINUOUS = "continuous"
+    ALLOW_REGENERATION = "allowRegeneration"
+    DONT_ALLOW_REGENERATION = "dontAllowRegeneration"
+
+    # Names of the open tasks of all simulated devices
+    _openTasks = set()
+    _openTasksLock = Lock()
+
+    def __init__(
+        self,
+        source=None,
+        noise=0,
+        realtime: bool = False,
+        seed: int = None,
+        routes: dict = None,
+        latency: float = 0,
+    ):
+        self.source = source
+        self.noise = noise
+        self.realtime = realtime
+        self.rng = np.random.default_rng(seed)
+        self.latency = latency
+
+        # Normalise routes to {input: (output, system)}
+        self.routes = {}
+        for inputChannel, route in (routes or {}).items():
+            output, system = (route, None) if isinstance(route, str) else route
+            self.routes[SimulatedBackend.channelKey(inputChannel)] = (
+                SimulatedBackend.channelKey(output),
+                system,
+            )
+
+        # Most recent `SimulatedOutput` of each output channel
+        self.written = {}
+        self.__filters = {}
+
+    @staticmethod
+    def channelKey(channel: str) -> str:
+        """
+        Physical channel name without the device name, e.g. "myDAQ1/AI0" -> "ai0"
+        """
+        return channel.split("/")[-1].lower()
+
+    def filterCoefficients(
+        self, system, samplerate: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Cached `discretise` of `system` at `samplerate`
+        """
+        key = (id(system), samplerate)
+        if key not in self.__filters:
+            self.__filters[key] = discretise(system, samplerate)
+
+        return self.__filters[key]
+
+    def output(self, channel: str, first: int, samples: int) -> np.ndarray:
+        """
+        Voltages on output `channel` at samples first, ..., first + samples - 1
+        since its task started
+        """
+        output = self.written.get(channel)
+        if output is None:
+            return np.zeros(samples)
+
+        return output.samples(first, samples)
+
+    def Task(self, name: str = "") -> "SimulatedTask":
+        if name:
+            with SimulatedBackend._openTasksLock:
+                if name in SimulatedBackend._openTasks:
+                    raise ValueError(
+                        f"Task name {name} conflicts with an existing task"
+                        " (DAQmx error -200089)"
+                    )
+                SimulatedBackend._openTasks.add(name)
+
+        return SimulatedTask(self, name)
+
+    @staticmethod
+    def reader(task: "SimulatedTask") -> "SimulatedReader":
+        return SimulatedReader(task)
+
+    @staticmethod
+    def writer(task: "SimulatedTask") -> "SimulatedWriter":
+        return SimulatedWriter(task)
+
+    @staticmethod
+    def commit(task: "SimulatedTask") -> None:
+        pass
+
+
+class SimulatedOutput:
+    """
+    Voltages generated on a simulated output channel, `offset` samples after
+    its task started. Regenerated voltages repeat indefinitely, others hold
+    their last value. Streamed voltages are appended, keeping only a window
+    of recent samples such that memory use does not grow with duration.
+    """
+
+    def __init__(self, voltages: np.ndarray, regenerate: bool = False):
+        self.voltages = voltages
+        self.offset = 0
+        self.regenerate = regenerate
+
+    def append(self, voltages: np.ndarray) -> None:
+        keep = min(voltages.size, self.voltages.size)
+        self.offset += self.voltages.size - keep
+        self.voltages = np.concatenate(
+            [self.voltages[self.voltages.size - keep :], voltages]
+        )
+
+    def samples(self, first: int, samples: int) -> np.ndarray:
+        if self.voltages.size == 0:
+            return np.zeros(samples)
+
+        index = np.arange(first, first + samples)
+        if self.regenerate:
+            signal = self.voltages[index % self.voltages.size]
+        else:
+            local = np.clip(index - self.offset, 0, self.voltages.size - 1)
+            signal = self.voltages[local]
+        signal[index < 0] = 0.0
+
+        return signal
+
+
+def discretise(system, samplerate: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Numerator and denominator of `system` discretised at `samplerate`,
+    for use with `lfilter`. Tuples describe a continuous system, as for `lsim`.
+    """
+    from scipy.signal import dlti, lti
+
+    if isinstance(system, dlti):
+        discrete = system
+    else:
+        if not isinstance(system, lti):
+            system = lti(*system)
+
+        # First-order hold matches the linear interpolation of `lsim`
+        discrete = system.to_discrete(1 / samplerate, method="foh")
+
+    discrete = discrete.to_tf()
+    return (
+        np.atleast_1d(np.squeeze(discrete.num)),
+        np.atleast_1d(np.squeeze(discrete.den)),
+    )
+
+
+class SimulatedChannels(list):
+    """
+    Channel collection of a simulated task, holding the physical channel names
+    """
+
+    def add_ai_voltage_chan(self, physical_channel: str) -> None:
+        self.append(physical_channel)
+
+    def add_ao_voltage_chan(self, physical_channel: str) -> None:
+        self.append(physical_channel)
+
+
+class SimulatedTiming:
+    """
+    Sample clock configuration of a simulated task
+    """
+
+    def __init__(self):
+        self.rate = None
+        self.sample_mode = SimulatedBackend.FINITE
+        self.samps_per_chan = None
+
+    def cfg_samp_clk_timing(
+        self,
+        rate: float,
+        sample_mode=SimulatedBackend.FINITE,
+        samps_per_chan: int = 1000,
+    ) -> None:
+        self.rate = rate
+        self.sample_mode = sample_mode
+        self.samps_per_chan = samps_per_chan
+
+
+class SimulatedOutStream:
+    """
+    Output stream properties of a simulated task
+    """
+
+    def __init__(self, task: "SimulatedTask"):
+        self.task = task
+        self.regen_mode = SimulatedBackend.ALLOW_REGENERATION
+
+    @property
+    def total_samp_per_chan_generated(self) -> int:
+        return self.task.samplesGenerated()
+
+
+class SimulatedTask:
+    """
+    Subset of `nidaqmx.Task` used by `MyDAQ`, backed by `SimulatedBackend`
+    """
+
+    def __init__(self, backend: SimulatedBackend, name: str = ""):
+        self.backend = backend
+        self.name = name
+        self.ai_channels = SimulatedChannels()
+        self.ao_channels = SimulatedChannels()
+        self.timing = SimulatedTiming()
+        self.out_stream = SimulatedOutStream(self)
+
+        self.running = False
+        self.closed = False
+        self.samplesRead = 0
+        self.samplesWritten = 0
+        self.startTime = None
+        self.data = None
+        self.filterStates = {}
+
+    def __enter__(self) -> "SimulatedTask":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def start(self) -> None:
+        self.running = True
+        self.samplesRead = 0
+        self.startTime = perf_counter()
+
+        # Output is "generated" as soon as the task starts
+        if self.data is not None:
+            regenerate = self.timing.sample_mode == SimulatedBackend.CONTINUOUS
+            regenerate &= self.out_stream.regen_mode == SimulatedBackend.ALLOW_REGENERATION
+            for channel, voltages in zip(self.ao_channels, self.data):
+                key = SimulatedBackend.channelKey(channel)
+                self.backend.written[key] = SimulatedOutput(voltages, regenerate)
+
+        # Routed systems start at rest
+        self.filterStates = {}
+
+    def stop(self) -> None:
+        self.running = False
+
+    def close(self) -> None:
+        self.stop()
+
+        # Closing twice is allowed, like DAQmx
+        if self.name and not self.closed:
+            with SimulatedBackend._openTasksLock:
+                SimulatedBackend._openTasks.discard(self.name)
+        self.closed = True
+
+    def remainingTime(self) -> float:
+        """
+        Time until a physical device would have finished a finite task
+        """
+        if not self.running:
+            return 0.0
+        if self.timing.sample_mode != SimulatedBackend.FINITE:
+            return np.inf
+        if not self.backend.realtime:
+            return 0.0
+
+        duration = self.timing.samps_per_chan / self.timing.rate
+        return max(self.startTime + duration - perf_counter(), 0.0)
+
+    def streaming(self) -> bool:
+        """
+        Whether writes append to the output, rather than replace it
+        """
+        return (
+            self.timing.sample_mode == SimulatedBackend.CONTINUOUS
+            and self.out_stream.regen_mode == SimulatedBackend.DONT_ALLOW_REGENERATION
+        )
+
+    def samplesGenerated(self) -> int:
+        """
+        Samples per channel a physical device would have generated by now
+        """
+        if self.startTime is None:
+            return 0
+
+        generated = self.samplesWritten
+        if self.backend.realtime:
+            elapsed = (perf_counter() - self.startTime) * self.timing.rate
+            if self.streaming():
+                generated = min(generated, int(elapsed))
+            else:
+                generated = int(elapsed)
+
+        return generated
+
+    def is_task_done(self) -> bool:
+        return self.remainingTime() == 0
+
+    def wait_until_done(self, timeout: float = 10) -> None:
+        remaining = self.remainingTime()
+        if remaining > timeout:
+            sleep(timeout)
+            raise TimeoutError(f"Task {self.name} did not finish within {timeout} s.")
+
+        sleep(remaining)
+
+    def write(self, data, auto_start: bool = False, timeout: float = 10) -> int:
+        data = np.atleast_2d(np.asarray(data, dtype=float))
+        samples = data.shape[-1]
+
+        if not (self.running and self.streaming()):
+            if self.data is not None and self.streaming():
+                data = np.concatenate([self.data, data], axis=-1)
+            self.data = data
+            self.samplesWritten = data.shape[-1]
+
+            if auto_start:
+                self.start()
+            return samples
+
+        # Streamed writes block while the device buffer is full
+        if self.backend.realtime:
+            bufferSize = self.timing.samps_per_chan
+            while self.samplesWritten - self.samplesGenerated() > bufferSize:
+                sleep(samples / self.timing.rate / 4)
+
+        for channel, voltages in zip(self.ao_channels, data):
+            self.backend.written[SimulatedBackend.channelKey(channel)].append(voltages)
+        self.samplesWritten += samples
+
+        return samples
+
+    def read(self, number_of_samples_per_channel: int = 1, timeout: float = 10):
+        """
+        Read like nidaqmx does, i.e. returning (nested) lists
+        """
+        data = self.acquire(number_of_samples_per_channel)
+
+        if len(self.ai_channels) == 1:
+            return data[0].tolist()
+        return data.tolist()
+
+    def acquire(self, samples: int) -> np.ndarray:
+        """
+        Acquire the next `samples` samples of every input channel
+        """
+        if not self.running:
+            self.start()
+
+        backend = self.backend
+        rate = self.timing.rate
+        first = self.samplesRead
+        timeArray = (first + np.arange(samples)) / rate
+        self.samplesRead += samples
+
+        data = np.zeros((len(self.ai_channels), samples))
+        if backend.source is not None:
+            data += backend.source(timeArray)
+
+        # Outputs routed to inputs, possibly through an LTI system
+        delay = round(backend.latency * rate)
+        for row, channel in zip(data, self.ai_channels):
+            route = backend.routes.get(SimulatedBackend.channelKey(channel))
+            if route is None:
+                continue
+
+            output, system = route
+            signal = backend.output(output, first - delay, samples)
+            if system is not None:
+                from scipy.signal import lfilter
+
+                b, a = backend.filterCoefficients(system, rate)
+                state = self.filterStates.get(channel)
+                if state is None:
+                    state = np.zeros(max(a.size, b.size) - 1)
+                signal, self.filterStates[channel] = lfilter(b, a, signal, zi=state)
+            row += signal
+
+        if callable(backend.noise):
+            data += backend.noise(backend.rng, data.shape)
+        elif backend.noise:
+            data += backend.rng.normal(0, backend.noise, data.shape)
+
+        # Wait until a physical device would have acquired the samples
+        if self.backend.realtime:
+            remaining = self.startTime + self.samplesRead / rate - perf_counter()
+            if remaining > 0:
+                sleep(remaining)
+
+        return data
+
+
+class SimulatedReader:
+    """
+    Counterpart of `nidaqmx.stream_readers.AnalogMultiChannelReader`
+    """
+
+    def __init__(self, task: SimulatedTask):
+        self.task = task
+
+    def read_many_sample(
+        self,
+        data: np.ndarray,
+        number_of_samples_per_channel: int = None,
+        timeout: float = 10,
+    ) -> int:
+        samples = number_of_samples_per_channel
+        if samples is None:
+            samples = data.shape[-1]
+
+        data[..., :samples] = self.task.acquire(samples)
+
+        return samples
+
+
+class SimulatedWriter:
+    """
+    Counterpart of `nidaqmx.stream_writers.AnalogMultiChannelWriter`
+    """
+
+    def __init__(self, task: SimulatedTask):
+        self.task = task
+
+    def write_many_sample(self, data: np.ndarray, timeout: float = 10) -> int:
+        return self.task.write(data)
@@ -0,0 +1,395 @@
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Event, Lock
+from time import perf_counter
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
+from span.instrumentation import instrumentation
+from span.trigger import RingBuffer
+
+# Transforms into a preallocated array need NumPy 2, else they are copied
+_RFFT_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+
+class WelchEstimator:
+    """
+    Segment-averaged (Welch) estimate of the (cross) spectral densities of
+    an output and optionally an input voltage, and from those the transfer
+    function and coherence. Voltages are fed incrementally in chunks using
+    `update`, and only the running sums of the segment spectra are kept,
+    together with less than one segment of unprocessed samples. Memory use
+    therefore does not depend on the length of the capture.
+
+    Segments of `nperseg` samples overlap by `noverlap` samples (half a
+    segment by default), are detrended by removing their mean, and are
+    weighted by `window`. The densities match `scipy.signal.csd` for the
+    same settings.
+    """
+
+    def __init__(
+        self,
+        samplerate: int,
+        nperseg: int = 4096,
+        noverlap: int = None,
+        window: str = "hann",
+    ):
+        self.samplerate = samplerate
+        self.nperseg = nperseg
+        self.noverlap = nperseg // 2 if noverlap is None else noverlap
+        assert 0 <= self.noverlap < nperseg, "Overlap should be smaller than a segment."
+
+        self.window = get_window(window, nperseg)
+        self.freqs = np.fft.rfftfreq(nperseg, d=1 / samplerate)
+
+        # One-sided density scaling, counting negative frequencies twice
+        self.scale = np.full(self.freqs.size, 2 / (samplerate * np.sum(self.window**2)))
+        self.scale[0] /= 2
+        if nperseg % 2 == 0:
+            self.scale[-1] /= 2
+
+        self.reset()
+
+    def reset(self) -> None:
+        self.segments = 0
+        self.__pending = None
+        self.__sumOut = 0.0
+        self.__sumIn = 0.0
+        self.__sumCross = 0.0
+
+    def update(
+        self, voltageOut: np.ndarray, voltageIn: np.ndarray = None
+    ) -> "WelchEstimator":
+        """
+        Add the next chunk of output (and input) voltages
+        """
+        chunk = np.atleast_2d(voltageOut)
+        if voltageIn is not None:
+            chunk = np.stack([voltageOut, voltageIn])
+
+        if self.__pending is not None:
+            assert self.__pending.shape[0] == chunk.shape[0], (
+                "Provide the input voltage for every chunk, or for none."
+            )
+            chunk = np.concatenate([self.__pending, chunk], axis=-1)
+
+        step = self.nperseg - self.noverlap
+        segments = 0
+        if chunk.shape[-1] >= self.nperseg:
+            segments = (chunk.shape[-1] - self.nperseg) // step + 1
+
+            # Spectra of all complete segments at once
+            windows = sliding_window_view(chunk, self.nperseg, axis=-1)[:, ::step]
+            windows = windows - windows.mean(axis=-1, keepdims=True)
+            spectra = np.fft.rfft(windows * self.window, axis=-1)
+
+            self.__sumOut = self.__sumOut + np.sum(np.abs(spectra[0]) ** 2, axis=0)
+            if chunk.shape[0] == 2:
+                self.__sumIn = self.__sumIn + np.sum(np.abs(spectra[1]) ** 2, axis=0)
+                self.__sumCross = self.__sumCross + np.sum(
+                    np.conj(spectra[1]) * spectra[0], axis=0
+                )
+
+        # Keep the samples from the start of the next segment onwards
+        self.__pending = chunk[:, segments * step :].copy()
+        self.segments += segments
+
+        return self
+
+    def _average(self, total) -> np.ndarray:
+        assert self.segments > 0, "Not enough samples for a single segment yet."
+        return self.scale * total / self.segments
+
+    @property
+    def Pout(self) -> np.ndarray:
+        """
+        Power spectral density of the output voltage
+        """
+        return self._average(self.__sumOut)
+
+    @property
+    def Pin(self) -> np.ndarray:
+        """
+        Power spectral density of the input voltage
+        """
+        return self._average(self.__sumIn)
+
+    @property
+    def Pcross(self) -> np.ndarray:
+        """
+        Cross spectral density of the input and output voltage
+        """
+        return self._average(self.__sumCross)
+
+    @property
+    def H1(self) -> np.ndarray:
+        """
+        Transfer function estimate robust against noise on the output
+        """
+        return self.Pcross / self.Pin
+
+    @property
+    def H2(self) -> np.ndarray:
+        """
+        Transfer function estimate robust against noise on the input
+        """
+        return self.Pout / np.conj(self.Pcross)
+
+    @property
+    def coherence(self) -> np.ndarray:
+        """
+        Magnitude squared coherence of the input and output voltage
+        """
+        return np.abs(self.Pcross) ** 2 / (self.Pin * self.Pout)
+
+    def getTransfer(self, freqs: np.ndarray, estimator: str = "H1") -> np.ndarray:
+        """
+        Transfer function at the frequency bin closest to each of `freqs`
+        """
+        match estimator:
+            case "H1":
+                transfer = self.H1
+            case "H2":
+                transfer = self.H2
+            case _:
+                raise ValueError(f"{estimator} is not a recognized estimator")
+
+        binWidth = self.samplerate / self.nperseg
+        closestIndex = np.round(np.asarray(freqs) / binWidth).astype(int)
+
+        return transfer[np.clip(closestIndex, 0, self.freqs.size - 1)]
+
+
+@dataclass
+class SpectrumFrames:
+    """
+    Frames published at once by a `RollingSpectrum`. `times` holds the time
+    of the first sample of every frame, and `magnitude` and `phase` have
+    shape (frames, channels, len(freqs)). The magnitude is the amplitude in
+    volts of a sine centred on a bin. The arrays are reused for the next
+    publication; copy them to keep them.
+    """
+
+    times: np.ndarray
+    magnitude: np.ndarray
+    phase: np.ndarray
+
+
+class RollingSpectrum:
+    """
+    Spectrum of a stream of chunks (e.g. of `MyDAQ.stream`) while it is
+    acquired: a short-time Fourier transform of segments of `nperseg`
+    samples, overlapping by `noverlap` samples and weighted by `window`.
+    Use as
+
+        with RollingSpectrum(daq.samplerate) as spectrum:
+            spectrum.subscribe(lambda frames: print(frames.magnitude[-1].max()))
+            for chunk in daq.stream(10_000, "AI0", chunks=100):
+                spectrum.update(chunk)
+
+    `update` only copies a chunk into a ring buffer of about `backlog`
+    seconds, so it keeps up with acquisition at the full samplerate. A
+    worker thread transforms all new segments at once into reused buffers,
+    and publishes them to the subscribers (from that thread) at most `rate`
+    times per second. If the worker or a subscriber falls behind by more
+    than `backlog` seconds, the oldest segments are dropped instead, so the
+    published frames stay close to real time.
+    """
+
+    def __init__(
+        self,
+        samplerate: int,
+        channels: int = 1,
+        nperseg: int = 4096,
+        noverlap: int = None,
+        window: str = "hann",
+        rate: float = 30,
+        backlog: float = 1,
+    ):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.nperseg = nperseg
+        self.noverlap = nperseg // 2 if noverlap is None else noverlap
+        assert 0 <= self.noverlap < nperseg, "Overlap should be smaller than a segment."
+        assert rate > 0, "Rate should be positive."
+
+        self.step = nperseg - self.noverlap
+        self.rate = rate
+
+        self.window = get_window(window, nperseg)
+        self.freqs = np.fft.rfftfreq(nperseg, d=1 / samplerate)
+
+        # Amplitude scaling, counting negative frequencies twice
+        self.scale = np.full(self.freqs.size, 2 / np.sum(self.window))
+        self.scale[0] /= 2
+        if nperseg % 2 == 0:
+            self.scale[-1] /= 2
+
+        # Most segments transformed at once, spanning the backlog. The ring
+        # also holds the samples after the last complete segment.
+        self.maxFrames = max(int(backlog * samplerate) // self.step, 1)
+        self.__size = self.maxFrames * self.step + nperseg
+
+        shape = (self.maxFrames, channels)
+        self.__segments = np.empty((*shape, nperseg))
+        self.__spectra = np.empty((*shape, self.freqs.size), dtype=np.complex128)
+        self.__magnitude = np.empty((*shape, self.freqs.size))
+        self.__phase = np.empty((*shape, self.freqs.size))
+
+        self.__subscribers = []
+        self.__lock = Lock()
+        self.__written = Event()
+        self.__stop = Event()
+        self.__worker = None
+        self.reset()
+
+    def reset(self) -> None:
+        assert self.__worker is None, "Cannot reset while running."
+
+        self.frames = 0
+        self.published = 0
+        self.dropped = 0
+        self.__ring = RingBuffer(self.channels, self.__size)
+        self.__next = 0
+        self.__started = None
+
+    def subscribe(self, callback: Callable[[SpectrumFrames], None]) -> None:
+        """
+        Call `callback(frames)` with every publication of new frames
+        """
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[SpectrumFrames], None]) -> None:
+        self.__subscribers.remove(callback)
+
+    def start(self) -> None:
+        """
+        Start transforming and publishing in the worker thread
+        """
+        assert self.__worker is None, "Already running."
+
+        self.__stop.clear()
+        self.__started = perf_counter()
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+        self.__worker = self.__executor.submit(self._run)
+
+    def update(self, chunk: np.ndarray) -> None:
+        """
+        Add the next chunk, of shape (channels, samples)
+        """
+        chunk = np.atleast_2d(chunk)
+        assert chunk.shape[0] == self.channels, "Wrong number of channels."
+
+        # Raise any error of the worker (or a subscriber)
+        if self.__worker is not None and self.__worker.done():
+            self.__worker.result()
+
+        with self.__lock:
+            self.__ring.write(chunk)
+        self.__written.set()
+
+    @property
+    def backlog(self) -> float:
+        """
+        Seconds of samples added but not yet transformed
+        """
+        return (self.__ring.total - self.__next) / self.samplerate
+
+    def getStatistics(self) -> dict:
+        """
+        Frames transformed, published and dropped so far, with the sustained
+        number of frames per second and the current backlog
+        """
+        elapsed = 0 if self.__started is None else perf_counter() - self.__started
+
+        return {
+            "frames": self.frames,
+            "publications": self.published,
+            "dropped": self.dropped,
+            "framesPerSecond": self.frames / elapsed if elapsed else 0,
+            "backlog": self.backlog,
+        }
+
+    def _run(self) -> None:
+        interval = 1 / self.rate
+        while True:
+            self.__written.wait()
+            self.__written.clear()
+            stopping = self.__stop.is_set()
+
+            start = perf_counter()
+            frames = self._transform()
+            if frames is not None:
+                for subscriber in list(self.__subscribers):
+                    subscriber(frames)
+                self.published += 1
+
+            if stopping:
+                return
+
+            # Publish at most `rate` times per second
+            self.__stop.wait(interval - (perf_counter() - start))
+
+    def _transform(self) -> SpectrumFrames | None:
+        """
+        Transform the segments that were completed since the previous call
+        """
+        with self.__lock:
+            available = self.__ring.total - self.__next - self.nperseg
+            if available < 0:
+                return None
+
+            # Skip the segments that no longer fit in the backlog
+            frames = available // self.step + 1
+            skipped = max(frames - self.maxFrames, 0)
+            frames -= skipped
+            self.dropped += skipped
+            self.__next += skipped * self.step
+
+            first = self.__next
+            last = first + (frames - 1) * self.step + self.nperseg
+            samples = self.__ring.window(first, last)
+            self.__next += frames * self.step
+
+        with instrumentation.stage("spectrum.transform", samples.size, samples.nbytes):
+            # All segments at once, into the reused buffers
+            segments = self.__segments[:frames]
+            windows = sliding_window_view(samples, self.nperseg, axis=-1)
+            windows = windows[:, :: self.step].swapaxes(0, 1)
+            np.multiply(windows, self.window, out=segments)
+
+            spectra = self.__spectra[:frames]
+            if _RFFT_OUT:
+                np.fft.rfft(segments, axis=-1, out=spectra)
+            else:
+                spectra[:] = np.fft.rfft(segments, axis=-1)
+            magnitude = np.abs(spectra, out=self.__magnitude[:frames])
+            magnitude *= self.scale
+            phase = np.arctan2(spectra.imag, spectra.real, out=self.__phase[:frames])
+
+        self.frames += frames
+        times = (first + self.step * np.arange(frames)) / self.samplerate
+
+        return SpectrumFrames(times, magnitude, phase)
+
+    def close(self) -> None:
+        """
+        Publish the remaining segments, and stop the worker thread
+        """
+        if self.__worker is None:
+            return
+
+        self.__stop.set()
+        self.__written.set()
+        self.__executor.shutdown()
+
+        worker, self.__worker = self.__worker, None
+        worker.result()
+
+    def __enter__(self) -> "RollingSpectrum":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
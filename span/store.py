@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from threading import Lock
+import numpy as np
+
+
+@dataclass
+class StoredPoint:
+    """
+    Result of a single point of a sweep, as kept by `SweepStore`. If the
+    capture was kept, it starts `offset` bytes into the captures file.
+    """
+
+    key: str
+    magnitude: float
+    phase: float
+    offset: int | None = None
+    shape: tuple[int, ...] | None = None
+
+
+class SweepStore:
+    """
+    On-disk store of the results of sweep points, keyed by a hash of the
+    configuration they were measured with (see `key`). Pass it to
+    `span.sweep.runSweep` or `pipelineSweep`, which skip the points already
+    in the store, so an interrupted sweep resumes where it stopped and an
+    identical sweep is not measured again.
+
+    The store is a directory holding `index.jsonl`, with one line of JSON
+    per point, and `captures.bin`, to which the raw captures (if kept) are
+    appended as float64. Both are only appended to. A capture is written
+    before the index line that refers to it, and that line is written in a
+    single call, so a crash at any moment leaves at most an incomplete last
+    line, which is dropped when the store is opened again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.__points = {}
+        self.__lock = Lock()
+        self._load()
+
+        self.__index = open(os.path.join(path, "index.jsonl"), "ab")
+        self.__captures = open(os.path.join(path, "captures.bin"), "ab")
+
+    def _load(self) -> None:
+        indexPath = os.path.join(self.path, "index.jsonl")
+        if not os.path.exists(indexPath):
+            return
+
+        complete = 0
+        with open(indexPath, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+
+                entry = json.loads(line)
+                shape = entry["shape"]
+                self.__points[entry["key"]] = StoredPoint(
+                    entry["key"],
+                    entry["magnitude"],
+                    entry["phase"],
+                    entry["offset"],
+                    None if shape is None else tuple(shape),
+                )
+
+        # Drop a last line left incomplete by a crash, before appending to it
+        if os.path.getsize(indexPath) > complete:
+            os.truncate(indexPath, complete)
+
+    @staticmethod
+    def key(**config) -> str:
+        """
+        SHA-256 hash of a measurement configuration, e.g. the device,
+        channels, samplerate, waveform parameters and frequency of a point
+        """
+        description = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, key: str) -> StoredPoint | None:
+        return self.__points.get(key)
+
+    def put(
+        self, key: str, magnitude: float, phase: float, capture: np.ndarray = None
+    ) -> StoredPoint:
+        """
+        Store the result of a point, and optionally its raw `capture`
+        """
+        with self.__lock:
+            offset = shape = None
+            if capture is not None:
+                capture = np.ascontiguousarray(capture, dtype=np.float64)
+                offset = self.__captures.seek(0, os.SEEK_END)
+                shape = capture.shape
+                self.__captures.write(capture)
+                self._sync(self.__captures)
+
+            point = StoredPoint(key, float(magnitude), float(phase), offset, shape)
+            entry = {
+                "key": key,
+                "magnitude": point.magnitude,
+                "phase": point.phase,
+                "offset": offset,
+                "shape": shape,
+            }
+            self.__index.write(json.dumps(entry).encode() + b"\n")
+            self._sync(self.__index)
+
+            self.__points[key] = point
+
+        return point
+
+    @staticmethod
+    def _sync(file) -> None:
+        file.flush()
+        os.fsync(file.fileno())
+
+    def getCapture(self, point: StoredPoint) -> np.ndarray | None:
+        """
+        Raw capture of `point` as a read-only memory map, if it was kept
+        """
+        if point.offset is None:
+            return None
+
+        return np.memmap(
+            os.path.join(self.path, "captures.bin"),
+            dtype=np.float64,
+            mode="r",
+            offset=point.offset,
+            shape=point.shape,
+        )
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__points
+
+    def __len__(self) -> int:
+        return len(self.__points)
+
+    def close(self) -> None:
+        self.__index.close()
+        self.__captures.close()
+
+    def __enter__(self) -> "SweepStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
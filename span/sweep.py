@@ -0,0 +1,740 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+import os
+from queue import Empty, Full, Queue
+from threading import Event
+import numpy as np
+from span.bode import Bode
+from span.daq import BufferPool, MyDAQ
+from span.simulation import discretise
+from span.store import SweepStore
+
+# Waveform buffers of the sweep, set up once per worker process
+_shared = {}
+
+
+def _initWorker(
+    samples: int, name: str = None, shape: tuple[int, ...] = None
+) -> None:
+    """
+    Worker initialiser, allocating a scratch buffer for the waveforms of one
+    point, or attaching to the shared waveforms of the sweep if they are kept
+    """
+    _shared["scratch"] = np.empty((2, samples))
+    if name is not None:
+        memory = SharedMemory(name=name)
+        _shared["memory"] = memory
+        _shared["waveforms"] = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+
+
+def _simulatePoint(
+    index: int,
+    frequency: float,
+    samplerate: int,
+    simulate,
+    delta: float,
+    method: str,
+) -> tuple[float, float]:
+    """
+    Simulate a single frequency of the sweep in a worker process. The
+    waveforms are written to the scratch buffer of the worker, or to the
+    shared memory if they are kept. Only power and phase are sent back.
+    """
+    if "waveforms" in _shared:
+        signalIn, signalOut = _shared["waveforms"][:, index]
+    else:
+        signalIn, signalOut = _shared["scratch"]
+
+    # Same sample times as `MyDAQ.getTimeArray`
+    timeArray = np.arange(1, signalIn.size + 1) / samplerate
+    np.sin(2 * np.pi * frequency * timeArray, out=signalIn)
+
+    if callable(simulate):
+        signalOut[:] = simulate(signalIn, samplerate)
+    else:
+        # Imported here rather than at the top, so spawned workers start quickly
+        from scipy.signal import lfilter
+
+        b, a = simulate
+        signalOut[:] = lfilter(b, a, signalIn)
+
+    bode = Bode(samplerate, signalOut, signalIn, method=method)
+
+    return bode.getPower(frequency, delta), bode.getPhase(frequency)
+
+
+def simulateSweep(
+    system,
+    freqs: np.ndarray,
+    samplerate: int,
+    samples: int,
+    delta: float = 1,
+    method: str = "fft",
+    workers: int = None,
+    keepWaveforms: bool = False,
+    store: SweepStore = None,
+    dut: str = None,
+) -> tuple[np.ndarray, ...]:
+    """
+    Simulate a sine sweep over `freqs` across a pool of processes
+
+    Parameters
+    ----------
+    system : LTI system, tuple or callable
+        System under test. Either a `scipy.signal` LTI system (or tuple
+        describing one, as for `lsim`), or a picklable callable
+        `simulate(signalIn, samplerate)` returning the output voltages.
+    freqs : ndarray
+        Frequencies of the sweep.
+    samplerate : int
+        Samplerate of the simulated waveforms.
+    samples : int
+        Number of samples simulated per frequency.
+    delta : float, optional
+        Bandwidth passed to `Bode.getPower`, widened to at least 1.5 times
+        the bin width (as in `runSweep`). The default is 1.
+    method : str, optional
+        Estimator used by `Bode`. The default is "fft".
+    workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    keepWaveforms : bool, optional
+        Whether to also return the simulated waveforms. Only then are they
+        kept in shared memory, of 16 bytes per sample and frequency.
+        The default is False.
+    store : SweepStore, optional
+        Store of the results, see `runSweep`. Frequencies already in it are
+        not simulated again. Points of an LTI system are keyed by its
+        discretised coefficients, those of a callable by `dut` only.
+        With `keepWaveforms`, the waveforms are stored too.
+    dut : str, optional
+        Description of the system under test, part of the keys in `store`.
+        Required to store the points of a callable, as the callable itself
+        cannot be told apart from others (e.g. lambdas or partials).
+
+    Returns
+    -------
+    magnitude : ndarray
+        Magnitude (ratio) at each frequency, in the order of `freqs`.
+    phase : ndarray
+        Phase (ratio) at each frequency, in the order of `freqs`.
+    signalOut, signalIn : ndarray
+        Output and input waveforms, of shape (len(freqs), samples).
+        Only returned if `keepWaveforms` is set.
+
+    """
+    assert store is None or not callable(system) or dut is not None, (
+        "Describe a callable system with dut to store its points."
+    )
+
+    freqs = np.asarray(freqs, dtype=float)
+    workers = workers or os.cpu_count()
+
+    # Discretise once, rather than in every worker
+    simulate = system if callable(system) else discretise(system, samplerate)
+
+    # The band should at least hold the neighbouring Fourier frequencies
+    delta = max(delta, 1.5 * samplerate / samples)
+
+    magnitude = np.empty(freqs.size)
+    phase = np.empty(freqs.size)
+    signalOut = np.empty((freqs.size, samples)) if keepWaveforms else None
+    signalIn = np.empty((freqs.size, samples)) if keepWaveforms else None
+
+    # Take the points in the store from there, and simulate the others
+    simulated = list(range(freqs.size))
+    if store is not None:
+        system = None
+        if not callable(simulate):
+            system = [coefficients.tolist() for coefficients in simulate]
+
+        keys = [
+            SweepStore.key(
+                backend="simulateSweep",
+                system=system,
+                dut=dut,
+                samplerate=samplerate,
+                samples=samples,
+                delta=delta,
+                method=method,
+                frequency=frequency,
+            )
+            for frequency in freqs
+        ]
+
+        simulated = []
+        for i, key in enumerate(keys):
+            stored = store.get(key)
+            if stored is None or (keepWaveforms and stored.offset is None):
+                simulated.append(i)
+                continue
+
+            magnitude[i], phase[i] = stored.magnitude, stored.phase
+            if keepWaveforms:
+                signalOut[i], signalIn[i] = store.getCapture(stored)
+
+    if simulated:
+        results = _simulatePoints(
+            simulate,
+            freqs[simulated],
+            samplerate,
+            samples,
+            delta,
+            method,
+            workers,
+            keepWaveforms,
+        )
+        magnitude[simulated], phase[simulated] = results[:2]
+        if keepWaveforms:
+            signalOut[simulated], signalIn[simulated] = results[2:]
+
+        if store is not None:
+            for i in simulated:
+                capture = None
+                if keepWaveforms:
+                    capture = np.stack([signalOut[i], signalIn[i]])
+                store.put(keys[i], magnitude[i], phase[i], capture)
+
+    if keepWaveforms:
+        return magnitude, phase, signalOut, signalIn
+
+    return magnitude, phase
+
+
+def _simulatePoints(
+    simulate,
+    freqs: np.ndarray,
+    samplerate: int,
+    samples: int,
+    delta: float,
+    method: str,
+    workers: int,
+    keepWaveforms: bool,
+) -> tuple[np.ndarray, ...]:
+    """
+    Simulate `freqs` across a pool of processes, see `simulateSweep`
+    """
+    # Kept waveforms are passed through shared memory, instead of pickled
+    shape = (2, freqs.size, samples)
+    memory = None
+    initargs = (samples,)
+    if keepWaveforms:
+        memory = SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        initargs = (samples, memory.name, shape)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initWorker,
+            initargs=initargs,
+        ) as executor:
+            results = list(
+                executor.map(
+                    _simulatePoint,
+                    range(freqs.size),
+                    freqs,
+                    [samplerate] * freqs.size,
+                    [simulate] * freqs.size,
+                    [delta] * freqs.size,
+                    [method] * freqs.size,
+                    chunksize=max(1, freqs.size // (4 * workers)),
+                )
+            )
+
+        powers, phases = np.array(results).reshape(freqs.size, 2).T
+        magnitude = np.sqrt(powers)
+
+        if keepWaveforms:
+            waveforms = np.ndarray(shape, dtype=np.float64, buffer=memory.buf).copy()
+            return magnitude, phases, waveforms[1], waveforms[0]
+
+        return magnitude, phases
+
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
+
+@dataclass
+class SweepPoint:
+    """
+    Capture of a single frequency of a sweep. `frequency` is the (coherent)
+    frequency actually generated, close to the `requested` frequency.
+    The first `settle` samples are discarded to let transients die out,
+    the following `samples` samples are analysed.
+    """
+
+    requested: float
+    frequency: float
+    samples: int
+    periods: float
+    settle: int = 0
+
+
+@dataclass
+class SweepPlan:
+    """
+    Capture length of every frequency of a sweep, as made by `planSweep`.
+    `overhead` is the expected time spent per point besides acquiring,
+    e.g. the setup time reported by `MyDAQ.lastTiming`.
+    """
+
+    samplerate: int
+    points: list[SweepPoint] = field(default_factory=list)
+    overhead: float = 0
+
+    @property
+    def freqs(self) -> np.ndarray:
+        return np.array([point.frequency for point in self.points])
+
+    @property
+    def samples(self) -> int:
+        return sum(point.settle + point.samples for point in self.points)
+
+    @property
+    def duration(self) -> float:
+        """
+        Expected total duration of the sweep in seconds
+        """
+        acquisition = MyDAQ.convertSamplesToDuration(self.samplerate, self.samples)
+        return acquisition + self.overhead * len(self.points)
+
+    def __str__(self) -> str:
+        title = "Sweep plan"
+
+        return (
+            title
+            + f"\n{'=' * len(title)}"
+            + f"\nPoints: {len(self.points)}"
+            + f"\nSamples: {self.samples}"
+            + f"\nExpected duration: {self.duration:.2f} s"
+        )
+
+
+def planSweep(
+    freqs: np.ndarray,
+    samplerate: int,
+    periods: float = 10,
+    minSamples: int = 1000,
+    maxSamples: int = None,
+    snr: float = None,
+    noise: float = None,
+    amplitude: float = 1,
+    coherent: bool = True,
+    settle: float = 0,
+    overhead: float = 0,
+) -> SweepPlan:
+    """
+    Pick the capture length of every frequency of a sweep
+
+    Parameters
+    ----------
+    freqs : ndarray
+        Requested frequencies of the sweep.
+    samplerate : int
+        Samplerate of the captures.
+    periods : float, optional
+        Minimum number of periods captured per frequency. The default is 10.
+    minSamples : int, optional
+        Minimum number of samples per capture. The default is 1000.
+    maxSamples : int, optional
+        Maximum number of samples per capture, taking precedence over the
+        other criteria. The default is no maximum.
+    snr : float, optional
+        Minimum signal-to-noise ratio in dB of the bin at the stimulus
+        frequency, given the noise standard deviation `noise` and the
+        stimulus `amplitude`. The default is no requirement.
+    noise : float, optional
+        Standard deviation of the (white) measurement noise in volts.
+    amplitude : int or float, optional
+        Amplitude of the stimulus in volts. The default is 1.
+    coherent : bool, optional
+        Whether to shift each frequency onto the nearest Fourier frequency
+        of its capture, such that it contains an integer number of periods
+        and no spectral leakage. The default is True.
+    settle : float, optional
+        Time in seconds captured before the analysed samples, to let the
+        device under test settle. The default is 0.
+    overhead : float, optional
+        Expected time per point besides acquiring, see `SweepPlan`.
+
+    Returns
+    -------
+    plan : SweepPlan
+        Capture of every frequency, in the order of `freqs`.
+
+    """
+    plan = SweepPlan(samplerate, overhead=overhead)
+    settleSamples = MyDAQ.convertDurationToSamples(samplerate, settle)
+
+    for requested in np.asarray(freqs, dtype=float):
+        samples = max(int(np.ceil(periods * samplerate / requested)), minSamples)
+
+        # A sine of amplitude A in white noise of standard deviation sigma
+        # has a bin SNR of N A^2 / (4 sigma^2) after an N-sample DFT
+        if snr is not None:
+            assert noise is not None, "The noise level is required for an SNR target."
+            required = 4 * noise**2 * 10 ** (snr / 10) / amplitude**2
+            samples = max(samples, int(np.ceil(required)))
+
+        if maxSamples is not None:
+            samples = min(samples, maxSamples)
+
+        # Make sure generating a waveform of this duration yields all samples
+        total = settleSamples + samples
+        duration = MyDAQ.convertSamplesToDuration(samplerate, total)
+        while MyDAQ.convertDurationToSamples(samplerate, duration) != total:
+            samples += 1
+            total += 1
+            duration = MyDAQ.convertSamplesToDuration(samplerate, total)
+
+        frequency = requested
+        if coherent:
+            cycles = max(round(requested * samples / samplerate), 1)
+            frequency = cycles * samplerate / samples
+
+        plan.points.append(
+            SweepPoint(
+                requested,
+                frequency,
+                samples,
+                frequency * MyDAQ.convertSamplesToDuration(samplerate, samples),
+                settleSamples,
+            )
+        )
+
+    return plan
+
+
+def runSweep(
+    daq: MyDAQ,
+    plan: SweepPlan,
+    readChannels: list[str],
+    writeChannel: str,
+    function: str = "sine",
+    amplitude: float = 1,
+    delta: float = None,
+    method: str = "fft",
+    onPoint: Callable[[int, float, float], None] = None,
+    store: SweepStore = None,
+    keepCaptures: bool = False,
+    dut: str = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Measure the sweep of `plan`, writing to `writeChannel` and reading the
+    output and input of the device under test on the two `readChannels`.
+    `onPoint(index, magnitude, phase)` is called after every point if
+    provided, e.g. `LiveBodePlot.update` of `span.plotting`.
+
+    If a `SweepStore` is provided, points already in it are not measured
+    again, and every measured point is added to it as soon as it is
+    analysed (with its raw capture if `keepCaptures`), so an interrupted
+    sweep resumes where it stopped. Points are keyed by the device, its
+    backend and the sweep settings, but the store cannot tell what is
+    connected to the device. Describe the device under test with `dut`
+    (e.g. "lowpass 1 kHz") when measuring several into one store.
+
+    Returns
+    -------
+    magnitude : ndarray
+        Magnitude (ratio) at each frequency of the plan.
+    phase : ndarray
+        Phase (ratio) at each frequency of the plan.
+
+    """
+    assert daq.samplerate == plan.samplerate, "Plan made for another samplerate."
+
+    magnitude = np.zeros(len(plan.points))
+    phase = np.zeros(len(plan.points))
+
+    keys = _pointKeys(
+        daq, plan, readChannels, writeChannel, function, amplitude, delta, method, dut
+    )
+
+    with daq.session():
+        for i, point in enumerate(plan.points):
+            stored = None if store is None else store.get(keys[i])
+            if stored is not None:
+                magnitude[i], phase[i] = stored.magnitude, stored.phase
+            else:
+                signalWrite = _generatePoint(plan, point, function, amplitude)
+                capture = daq.readwrite(signalWrite, readChannels, writeChannel)
+                magnitude[i], phase[i] = _analysePoint(
+                    plan, point, capture[0], capture[1], delta, method
+                )
+                if store is not None:
+                    kept = capture if keepCaptures else None
+                    store.put(keys[i], magnitude[i], phase[i], kept)
+
+            if onPoint is not None:
+                onPoint(i, magnitude[i], phase[i])
+
+    return magnitude, phase
+
+
+def _pointKeys(
+    daq: MyDAQ,
+    plan: SweepPlan,
+    readChannels: list[str],
+    writeChannel: str,
+    function: str,
+    amplitude: float,
+    delta: float,
+    method: str,
+    dut: str,
+) -> list[str]:
+    """
+    `SweepStore` key of every point of a sweep
+    """
+    return [
+        SweepStore.key(
+            device=daq.name,
+            backend=type(daq.backend).__name__,
+            dut=dut,
+            readChannels=list(readChannels),
+            writeChannel=writeChannel,
+            samplerate=plan.samplerate,
+            function=function,
+            amplitude=amplitude,
+            delta=delta,
+            method=method,
+            frequency=point.frequency,
+            samples=point.samples,
+            settle=point.settle,
+        )
+        for point in plan.points
+    ]
+
+
+def _generatePoint(
+    plan: SweepPlan, point: SweepPoint, function: str, amplitude: float
+) -> np.ndarray:
+    """
+    Stimulus of a single point of a sweep, including its settling time.
+    Stimuli are only read, so they are shared through the waveform cache.
+    """
+    duration = MyDAQ.convertSamplesToDuration(
+        plan.samplerate, point.settle + point.samples
+    )
+    __, signalWrite = MyDAQ.generateWaveform(
+        function,
+        plan.samplerate,
+        frequency=point.frequency,
+        amplitude=amplitude,
+        duration=duration,
+        cache=True,
+    )
+
+    return signalWrite
+
+
+def _analysePoint(
+    plan: SweepPlan,
+    point: SweepPoint,
+    signalOut: np.ndarray,
+    signalIn: np.ndarray,
+    delta: float,
+    method: str,
+) -> tuple[float, float]:
+    """
+    Magnitude and phase of a single captured point of a sweep
+    """
+    signalOut = signalOut[point.settle :]
+    signalIn = signalIn[point.settle :]
+
+    # The band should at least hold the neighbouring Fourier frequencies
+    binWidth = plan.samplerate / point.samples
+    bandwidth = max(delta or 0, 1.5 * binWidth)
+
+    bode = Bode(plan.samplerate, signalOut, signalIn, method=method)
+    magnitude = np.sqrt(bode.getPower(point.frequency, bandwidth))
+
+    return magnitude, bode.getPhase(point.frequency)
+
+
+# Marks the end of the items passed between the stages of `pipelineSweep`
+_DONE = object()
+
+
+def pipelineSweep(
+    daq: MyDAQ,
+    plan: SweepPlan,
+    readChannels: list[str],
+    writeChannel: str,
+    function: str = "sine",
+    amplitude: float = 1,
+    delta: float = None,
+    method: str = "fft",
+    depth: int = 2,
+    stop: Event = None,
+    onPoint: Callable[[int, float, float], None] = None,
+    store: SweepStore = None,
+    keepCaptures: bool = False,
+    dut: str = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Measure the sweep of `plan` like `runSweep`, but overlap generating the
+    stimulus of the next point and analysing the capture of the previous
+    point with acquiring the current point. Generation and analysis each
+    run in their own thread, connected to the acquisition by queues of at
+    most `depth` points. A stage that gets ahead therefore waits for the
+    others, bounding the memory in use, and the sweep takes about as long
+    as acquiring alone.
+
+    Parameters
+    ----------
+    daq : MyDAQ
+        Device to measure with.
+    plan : SweepPlan
+        Points of the sweep, as made by `planSweep`.
+    readChannels : list[str]
+        Channels reading the output and input of the device under test.
+    writeChannel : str
+        Channel writing the stimulus.
+    function : str, optional
+        Shape of the stimulus. The default is "sine".
+    amplitude : float, optional
+        Amplitude of the stimulus in volts. The default is 1.
+    delta : float, optional
+        Bandwidth passed to `Bode.getPower`, see `runSweep`.
+    method : str, optional
+        Estimator used by `Bode`. The default is "fft".
+    depth : int, optional
+        Maximum number of points waiting between two stages. The default is 2.
+    stop : Event, optional
+        Set (e.g. from another thread) to cancel the sweep. Points that were
+        not analysed by then are NaN.
+    onPoint : callable, optional
+        Called as `onPoint(index, magnitude, phase)` for every analysed
+        point. Calls are made from the calling thread in between
+        acquisitions, so it may update e.g. a `LiveBodePlot`.
+    store : SweepStore, optional
+        Store of the results, see `runSweep`. Points in it are reported to
+        `onPoint` before acquisition starts. Measured points are stored by
+        the analysis thread.
+    keepCaptures : bool, optional
+        Whether to store the raw captures too. The default is False.
+    dut : str, optional
+        Description of the device under test, part of the keys of the
+        points in `store`, see `runSweep`.
+
+    Returns
+    -------
+    magnitude : ndarray
+        Magnitude (ratio) at each frequency of the plan.
+    phase : ndarray
+        Phase (ratio) at each frequency of the plan.
+
+    """
+    assert daq.samplerate == plan.samplerate, "Plan made for another samplerate."
+    assert depth > 0, "Depth should be positive."
+
+    stop = Event() if stop is None else stop
+    magnitude = np.full(len(plan.points), np.nan)
+    phase = np.full(len(plan.points), np.nan)
+
+    waveforms = Queue(maxsize=depth)
+    captures = Queue(maxsize=depth)
+    analysed = Queue()
+    buffers = BufferPool()
+
+    keys = _pointKeys(
+        daq, plan, readChannels, writeChannel, function, amplitude, delta, method, dut
+    )
+    measure = []
+    for i in range(len(plan.points)):
+        stored = None if store is None else store.get(keys[i])
+        if stored is None:
+            measure.append(i)
+            continue
+
+        magnitude[i], phase[i] = stored.magnitude, stored.phase
+        if onPoint is not None:
+            onPoint(i, magnitude[i], phase[i])
+
+    def put(queue: Queue, item) -> bool:
+        """
+        Wait for room in `queue`, returning False if stopped meanwhile
+        """
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def get(queue: Queue):
+        """
+        Wait for the next item of `queue`, or `_DONE` if stopped meanwhile
+        """
+        while not stop.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                pass
+        return _DONE
+
+    def generate() -> None:
+        try:
+            for i in measure:
+                signalWrite = _generatePoint(plan, plan.points[i], function, amplitude)
+                if not put(waveforms, (i, signalWrite)):
+                    return
+            put(waveforms, _DONE)
+        except BaseException:
+            stop.set()
+            raise
+
+    def analyse() -> None:
+        try:
+            while (item := get(captures)) is not _DONE:
+                i, capture = item
+                magnitude[i], phase[i] = _analysePoint(
+                    plan, plan.points[i], capture[0], capture[1], delta, method
+                )
+                if store is not None:
+                    kept = capture if keepCaptures else None
+                    store.put(keys[i], magnitude[i], phase[i], kept)
+                buffers.release(capture)
+                analysed.put(i)
+        except BaseException:
+            stop.set()
+            raise
+
+    def report() -> None:
+        """
+        Pass the points analysed so far to `onPoint`
+        """
+        while onPoint is not None and not analysed.empty():
+            i = analysed.get()
+            onPoint(i, magnitude[i], phase[i])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        generator = executor.submit(generate)
+        analyser = executor.submit(analyse)
+
+        try:
+            with daq.session():
+                while (item := get(waveforms)) is not _DONE:
+                    i, signalWrite = item
+
+                    # Captures are read into reused buffers, released by analysis
+                    capture = buffers.get((len(readChannels), signalWrite.size))
+                    daq.readwrite(signalWrite, readChannels, writeChannel, out=capture)
+                    if not put(captures, (i, capture)):
+                        break
+                    report()
+            put(captures, _DONE)
+
+            # Raise any error of the other stages
+            generator.result()
+            analyser.result()
+            report()
+        except BaseException:
+            stop.set()
+            raise
+
+    return magnitude, phase
@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of the most recent `size` samples of each channel,
+    for continuous acquisition in constant memory. Samples are addressed
+    by their absolute index since the first `write`.
+    """
+
+    def __init__(self, channels: int, size: int):
+        assert size > 0, "Size should be positive."
+
+        self.size = size
+        self.total = 0
+        self.__buffer = np.zeros((channels, size))
+
+    @property
+    def first(self) -> int:
+        """
+        Absolute index of the oldest sample still in the buffer
+        """
+        return max(self.total - self.size, 0)
+
+    def write(self, chunk: np.ndarray) -> None:
+        """
+        Append a chunk of shape (channels, samples), overwriting the oldest
+        samples once the buffer is full
+        """
+        chunk = np.atleast_2d(chunk)
+        samples = chunk.shape[-1]
+
+        # Only the last `size` samples of a longer chunk are kept
+        kept = chunk[:, -self.size :]
+        start = (self.total + samples - kept.shape[-1]) % self.size
+
+        # At most two copies, before and after wrapping around
+        first = min(kept.shape[-1], self.size - start)
+        self.__buffer[:, start : start + first] = kept[:, :first]
+        self.__buffer[:, : kept.shape[-1] - first] = kept[:, first:]
+
+        self.total += samples
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        """
+        Copy of the samples with absolute indices from `start` up to `stop`,
+        of shape (channels, stop - start). Only the window is copied.
+        """
+        assert self.first <= start <= stop <= self.total, (
+            "Window is no longer (or not yet) in the buffer."
+        )
+
+        indices = np.arange(start, stop) % self.size
+        return self.__buffer.take(indices, axis=-1)
+
+
+class Trigger:
+    """
+    Software trigger on the samples of one channel, evaluated on a whole
+    chunk at once. `slope` is one of
+
+    * "rising" or "falling", firing where the signal crosses `level`
+      upwards or downwards (edge triggers).
+    * "above" or "below", firing where the signal is above or below
+      `level` (level triggers).
+
+    After firing, the trigger is not re-armed for `holdoff` samples.
+    The last sample of every chunk is kept, so edges between two chunks
+    are found too.
+    """
+
+    def __init__(
+        self, level: float, slope: str = "rising", channel: int = 0, holdoff: int = 1
+    ):
+        if slope not in ("rising", "falling", "above", "below"):
+            raise ValueError(f"{slope} is not a recognized trigger slope")
+        assert holdoff > 0, "Holdoff should be positive."
+
+        self.level = level
+        self.slope = slope
+        self.channel = channel
+        self.holdoff = holdoff
+        self.reset()
+
+    def reset(self) -> None:
+        self.__previous = None
+        self.__armedFrom = 0
+
+    def find(self, chunk: np.ndarray, offset: int, holdoff: int = None) -> np.ndarray:
+        """
+        Absolute indices at which the trigger fires in `chunk`, of shape
+        (channels, samples), whose first sample has absolute index `offset`.
+        `holdoff` overrides the holdoff of the trigger if provided.
+        """
+        holdoff = self.holdoff if holdoff is None else holdoff
+        signal = np.atleast_2d(chunk)[self.channel]
+
+        match self.slope:
+            case "rising" | "above":
+                condition = signal >= self.level
+            case "falling" | "below":
+                condition = signal <= self.level
+
+        candidates = condition
+        if self.slope in ("rising", "falling"):
+            # An edge is where the condition starts to hold
+            before = np.empty_like(condition)
+            before[1:] = condition[:-1]
+            before[0] = True if self.__previous is None else self.__previous
+            candidates = condition & ~before
+            self.__previous = condition[-1]
+
+        candidates = np.flatnonzero(candidates) + offset
+
+        # Only fire once per holdoff, jumping over the candidates in between
+        fired = []
+        index = np.searchsorted(candidates, self.__armedFrom)
+        while index < candidates.size:
+            fired.append(candidates[index])
+            self.__armedFrom = candidates[index] + holdoff
+            index = np.searchsorted(candidates, self.__armedFrom, side="left")
+
+        return np.array(fired, dtype=int)
+
+
+@dataclass
+class TriggerEvent:
+    """
+    Capture around a trigger, as yielded by `MyDAQ.triggered`. `data` has
+    shape (channels, samples), and the trigger fired at sample `pre` of it.
+    """
+
+    sample: int
+    time: float
+    pre: int
+    data: np.ndarray